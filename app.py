@@ -24,6 +24,16 @@ from pathlib import Path
 # src_path = Path(__file__).parent / 'src'
 # sys.path.insert(0, str(src_path))
 
+def load_app():
+    """Import the Flask app and apply the entry point's configuration"""
+    # Import the Flask app from root crm_app module
+    import crm_app
+    app = crm_app.app
+    
+    # Configure app paths
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    return app
+
 def main():
     """Main application entry point"""
     parser = argparse.ArgumentParser(description='DLA CRM System')
@@ -42,12 +52,7 @@ def main():
     print("=" * 60)
     
     try:
-        # Import the Flask app from root crm_app module
-        import crm_app
-        app = crm_app.app
-        
-        # Configure app paths
-        app.config['TEMPLATES_AUTO_RELOAD'] = True
+        app = load_app()
         
         # Start the Flask application
         app.run(
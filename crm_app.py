@@ -2,16 +2,22 @@
 # Flask-based web interface for the CRM system
 
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from collections import defaultdict
 from datetime import datetime, date, timedelta
 import json
 import os
-import traceback
 import logging
-import sqlite3
 from pathlib import Path
 
+# orjson is optional; when installed it handles API JSON encoding/decoding
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import our CRM modules
-from src.core.config_manager import config_manager
+from src.core.config_manager import config_manager, read_json_file
 from src.core.crm_data import crm_data
 from src.core.crm_automation import crm_automation
 from src.pdf.dibbs_crm_processor import dibbs_processor
@@ -21,6 +27,9 @@ from src.email_automation.email_automation import email_automation
 EMAIL_CONFIG_PATH = 'email_config.json'
 OAUTH2_CONFIG_PATH = 'oauth2_config.json'
 LOCALHOST_BASE_URL = 'http://localhost:5000'
+GMAIL_REDIRECT_URI = f'{LOCALHOST_BASE_URL}/auth/gmail/callback'
+OUTLOOK_REDIRECT_URI = f'{LOCALHOST_BASE_URL}/auth/outlook/callback'
+SMTP_TEST_TIMEOUT = 10  # seconds before an SMTP connection test gives up
 
 # Initialize config manager and ensure directories exist
 config_manager.ensure_directories()
@@ -28,6 +37,21 @@ app_config = config_manager.get_app_config()
 
 app = Flask(__name__)
 
+if orjson is not None:
+    class ORJSONProvider(DefaultJSONProvider):
+        """Flask JSON provider backed by orjson, deferring other types to Flask's default()"""
+        
+        _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        
+        def dumps(self, obj, **kwargs):
+            option = self._OPTIONS | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+    
+    app.json = ORJSONProvider(app)
+
 # Use configuration for secret key
 app.secret_key = os.getenv('FLASK_SECRET_KEY', app_config.get('secret_key', 'your-secret-key-here'))
 
@@ -39,9 +63,9 @@ app.static_folder = 'web/static'
 def load_json_config(config_path, default=None):
     """Load JSON configuration file with error handling"""
     try:
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                return json.load(f)
+        # Only re-read and re-parse the file when it has changed on disk
+        return read_json_file(config_path)
+    except FileNotFoundError:
         return default or {}
     except (json.JSONDecodeError, IOError) as e:
         app.logger.error(f"Error loading config from {config_path}: {e}")
@@ -99,6 +123,53 @@ def handle_api_success(data=None, message="Operation successful"):
         response.update(data)
     return jsonify(response)
 
+def iter_pdf_files(directory):
+    """Yield DirEntry objects for PDF files (any case) in a directory, in one pass"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.pdf') and entry.is_file():
+                yield entry
+
+def has_pdf_files(directory):
+    """Return True as soon as one PDF file is found, closing the directory handle"""
+    with os.scandir(directory) as entries:
+        return any(entry.name.lower().endswith('.pdf') and entry.is_file() for entry in entries)
+
+def count_pdf_files(directory):
+    """Count PDF files in a directory without building intermediate lists"""
+    return sum(1 for _ in iter_pdf_files(directory))
+
+def get_existing_tables():
+    """Return the set of table names in the CRM database from one sqlite_master scan"""
+    rows = crm_data.execute_query("SELECT name FROM sqlite_master WHERE type='table'")
+    return {row['name'] for row in rows}
+
+def get_reviewed_pdf_stats():
+    """Count processed and skipped PDFs with one directory scan per folder"""
+    stats = {
+        'processed': 0,
+        'skipped': 0
+    }
+    
+    # A single pass over the reviewed folder counts its PDFs and finds the
+    # Skipped subfolder, so no separate exists() checks are needed
+    reviewed_dir = config_manager.get_processed_dir()
+    has_skipped_dir = False
+    try:
+        with os.scandir(reviewed_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    has_skipped_dir = has_skipped_dir or entry.name == 'Skipped'
+                elif entry.name.lower().endswith('.pdf'):
+                    stats['processed'] += 1
+    except FileNotFoundError:
+        return stats
+    
+    if has_skipped_dir:
+        stats['skipped'] = count_pdf_files(reviewed_dir / 'Skipped')
+    
+    return stats
+
 # Add custom Jinja2 filters
 @app.template_filter('to_datetime')
 def to_datetime_filter(date_string):
@@ -155,19 +226,7 @@ def settings():
     current_settings = dibbs_processor.get_filter_settings()
     
     # Get processing statistics
-    stats = {
-        'processed': 0,
-        'skipped': 0
-    }
-    
-    # Count files in reviewed folders using config manager
-    reviewed_dir = config_manager.get_processed_dir()
-    if reviewed_dir.exists():
-        stats['processed'] = len(list(reviewed_dir.glob("*.pdf"))) + len(list(reviewed_dir.glob("*.PDF")))
-        
-        skipped_dir = reviewed_dir / "Skipped"
-        if skipped_dir.exists():
-            stats['skipped'] = len(list(skipped_dir.glob("*.pdf"))) + len(list(skipped_dir.glob("*.PDF")))
+    stats = get_reviewed_pdf_stats()
     
     return render_template('settings.html', settings=current_settings, stats=stats)
 
@@ -246,7 +305,7 @@ def handle_email_settings():
                     "enabled": False,
                     "client_id": "",
                     "client_secret": "",
-                    "redirect_uri": f"{LOCALHOST_BASE_URL}/auth/gmail/callback",
+                    "redirect_uri": GMAIL_REDIRECT_URI,
                     "user_email": ""
                 },
                 "outlook_oauth2": {
@@ -254,7 +313,7 @@ def handle_email_settings():
                     "client_id": "",
                     "client_secret": "",
                     "tenant_id": "",
-                    "redirect_uri": f"{LOCALHOST_BASE_URL}/auth/outlook/callback",
+                    "redirect_uri": OUTLOOK_REDIRECT_URI,
                     "user_email": ""
                 },
                 "rfq_automation": {
@@ -347,10 +406,10 @@ def test_email_connection():
         try:
             if smtp_config.get('use_tls', True):
                 context = ssl.create_default_context()
-                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'])
+                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'], timeout=SMTP_TEST_TIMEOUT)
                 server.starttls(context=context)
             else:
-                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'])
+                server = smtplib.SMTP(smtp_config['host'], smtp_config['port'], timeout=SMTP_TEST_TIMEOUT)
             
             server.login(smtp_config['username'], smtp_config['password'])
             server.quit()
@@ -381,27 +440,20 @@ def get_email_status():
             if smtp_config.get('enabled') and smtp_config.get('host') and smtp_config.get('username'):
                 connection_status = 'configured'
         
-        # Get email statistics from database
-        conn = sqlite3.connect(str(config_manager.get_database_path()))
-        cursor = conn.cursor()
-        
-        # Emails sent today
-        today = datetime.now().strftime('%Y-%m-%d')
-        cursor.execute("""
-            SELECT COUNT(*) FROM vendor_rfq_emails 
-            WHERE DATE(sent_date) = ? AND status = 'Sent'
-        """, (today,))
-        emails_sent_today = cursor.fetchone()[0]
+        # Get email statistics over the app's shared database connection
+        # Emails sent today (range on sent_date so the status/sent_date index applies)
+        today = date.today()
+        emails_sent_today = crm_data.execute_query("""
+            SELECT COUNT(*) as count FROM vendor_rfq_emails 
+            WHERE status = 'Sent' AND sent_date >= ? AND sent_date < ?
+        """, [today.isoformat(), (today + timedelta(days=1)).isoformat()])[0]['count']
         
         # Responses received this week
         week_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        cursor.execute("""
-            SELECT COUNT(*) FROM vendor_rfq_emails 
+        responses_received = crm_data.execute_query("""
+            SELECT COUNT(*) as count FROM vendor_rfq_emails 
             WHERE response_received_date >= ?
-        """, (week_ago,))
-        responses_received = cursor.fetchone()[0]
-        
-        conn.close()
+        """, [week_ago])[0]['count']
         
         status = {
             'connection_status': connection_status,
@@ -437,7 +489,7 @@ def initiate_gmail_oauth():
             'https://www.googleapis.com/auth/gmail.readonly'
         ]
         
-        redirect_uri = gmail_config.get('redirect_uri', f'{LOCALHOST_BASE_URL}/auth/gmail/callback')
+        redirect_uri = gmail_config.get('redirect_uri', GMAIL_REDIRECT_URI)
         auth_url = (
             f"https://accounts.google.com/o/oauth2/auth?"
             f"client_id={client_id}&"
@@ -508,7 +560,7 @@ def initiate_outlook_oauth():
             'https://graph.microsoft.com/User.Read'
         ]
         
-        redirect_uri = outlook_config.get('redirect_uri', f'{LOCALHOST_BASE_URL}/auth/outlook/callback')
+        redirect_uri = outlook_config.get('redirect_uri', OUTLOOK_REDIRECT_URI)
         auth_url = (
             f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/authorize?"
             f"client_id={client_id}&"
@@ -1604,17 +1656,15 @@ def products():
         filters['fsc'] = fsc
     
     products_list = crm_data.get_products(filters)
-    
-    # Add QPL manufacturer information to each product
-    for product in products_list:
-        if product.get('id'):
-            qpl_manufacturers = crm_data.get_qpl_manufacturers_for_product(product['id'])
-            product['qpl_manufacturers'] = qpl_manufacturers
-        else:
-            product['qpl_manufacturers'] = []
-    
     pagination = paginate_results(products_list, page)
     
+    # Add QPL manufacturer information to the displayed products with one query
+    qpl_by_product = crm_data.get_qpl_manufacturers_for_products(
+        [product['id'] for product in pagination['items'] if product.get('id')]
+    )
+    for product in pagination['items']:
+        product['qpl_manufacturers'] = qpl_by_product.get(product.get('id'), [])
+    
     return render_template('products.html', 
                          products=pagination['items'], 
                          pagination=pagination,
@@ -2201,7 +2251,7 @@ def task_detail(task_id):
                         data_str = task['description'][start_index:end_index]
                         app.logger.info(f"Extracted data string length: {len(data_str)}")
                         app.logger.info(f"Data string preview: '{data_str[:100]}...'")
-                        processing_data = json.loads(data_str)
+                        processing_data = app.json.loads(data_str)
                         app.logger.info(f"Successfully parsed processing data with {len(processing_data)} keys")
                         app.logger.info(f"Processing data keys: {list(processing_data.keys())}")
                         
@@ -2217,57 +2267,69 @@ def task_detail(task_id):
                         # This ensures we show all the records that were actually created
                         try:
                             # Get records created on the same date as this task
-                            task_date = task.get('created_date', '')[:10]  # Get just the date part (YYYY-MM-DD)
-                            
-                            # Get actual opportunities
-                            all_opportunities = crm_data.get_opportunities()
-                            today_opportunities = [opp for opp in all_opportunities 
-                                                 if opp.get('created_date', '')[:10] == task_date]
+                            task_date = (task.get('created_date') or '')[:10]  # Get just the date part (YYYY-MM-DD)
                             
-                            # Get actual contacts 
-                            all_contacts = crm_data.get_contacts()
-                            today_contacts = [contact for contact in all_contacts 
-                                            if contact.get('created_date', '')[:10] == task_date]
-                            
-                            # Get actual accounts
-                            all_accounts = crm_data.get_accounts()
-                            today_accounts = [account for account in all_accounts 
-                                            if account.get('created_date', '')[:10] == task_date]
-                            
-                            # Get actual products
-                            all_products = crm_data.get_products()
-                            today_products = [product for product in all_products 
-                                            if product.get('created_date', '')[:10] == task_date]
-                            
-                            # Get QPLs created today (using qpls table)
-                            try:
-                                qpls_query = f'SELECT id, manufacturer_name, part_number, created_date FROM qpls WHERE date(created_date) = "{task_date}" ORDER BY id'
-                                qpl_results = crm_data.execute_query(qpls_query)
-                                today_qpls = [{'id': qpl['id'], 'name': f"{qpl['manufacturer_name']} - {qpl['part_number']}" if qpl['part_number'] else qpl['manufacturer_name'] or 'Unknown QPL', 'created_date': qpl['created_date']} for qpl in qpl_results]
-                            except Exception as qpl_error:
-                                app.logger.error(f"Error loading QPL data: {str(qpl_error)}")
-                                today_qpls = []
+                            # One UNION ALL statement covers all five tables; each arm is a
+                            # created_date range seek on that table's index
+                            same_day_query = """
+                                SELECT * FROM (
+                                    SELECT 'opportunities' AS src, o.id, o.name, p.nsn AS detail, o.created_date
+                                    FROM opportunities o
+                                    LEFT JOIN products p ON o.product_id = p.id
+                                    WHERE o.created_date >= ? AND o.created_date < date(?, '+1 day')
+                                    UNION ALL
+                                    SELECT 'contacts', id,
+                                           COALESCE(first_name || ' ' || last_name, first_name, last_name, 'Unknown Contact'),
+                                           email, created_date
+                                    FROM contacts
+                                    WHERE is_active = 1 AND created_date >= ? AND created_date < date(?, '+1 day')
+                                    UNION ALL
+                                    SELECT 'accounts', id, name, NULL, created_date
+                                    FROM accounts
+                                    WHERE is_active = 1 AND created_date >= ? AND created_date < date(?, '+1 day')
+                                    UNION ALL
+                                    SELECT 'products', id, name, nsn, created_date
+                                    FROM products
+                                    WHERE is_active = 1 AND created_date >= ? AND created_date < date(?, '+1 day')
+                                    UNION ALL
+                                    SELECT 'qpls', id,
+                                           CASE WHEN part_number != '' THEN manufacturer_name || ' - ' || part_number
+                                                ELSE COALESCE(NULLIF(manufacturer_name, ''), 'Unknown QPL') END,
+                                           NULL, created_date
+                                    FROM qpls
+                                    WHERE created_date >= ? AND created_date < date(?, '+1 day')
+                                )
+                                ORDER BY src, CASE src WHEN 'opportunities' THEN created_date END DESC, id
+                            """
+                            records = defaultdict(list)
+                            # Without a creation date no range can match, so skip the query
+                            if task_date:
+                                for row in crm_data.execute_query(same_day_query, (task_date, task_date) * 5):
+                                    records[row['src']].append(row)
                             
                             # Update processing data with real counts and data
                             processing_data['created_opportunities'] = [
-                                {'id': opp['id'], 'request_number': opp.get('name', 'Unknown'), 'nsn': opp.get('product_nsn', 'N/A')}
-                                for opp in today_opportunities
+                                {'id': opp['id'], 'request_number': opp['name'], 'nsn': opp['detail']}
+                                for opp in records['opportunities']
                             ]
                             processing_data['created_contacts'] = [
-                                {'id': contact['id'], 'name': contact.get('name', 'Unknown'), 'email': contact.get('email', 'No email')}
-                                for contact in today_contacts
+                                {'id': contact['id'], 'name': contact['name'], 'email': contact['detail']}
+                                for contact in records['contacts']
                             ]
                             processing_data['created_accounts'] = [
-                                {'id': account['id'], 'name': account.get('name', 'Unknown')}
-                                for account in today_accounts
+                                {'id': account['id'], 'name': account['name']}
+                                for account in records['accounts']
                             ]
                             processing_data['created_products'] = [
-                                {'id': product['id'], 'name': product.get('name', 'Unknown'), 'nsn': product.get('nsn', 'N/A')}
-                                for product in today_products
+                                {'id': product['id'], 'name': product['name'], 'nsn': product['detail']}
+                                for product in records['products']
+                            ]
+                            processing_data['created_qpls'] = [
+                                {'id': qpl['id'], 'name': qpl['name'], 'created_date': qpl['created_date']}
+                                for qpl in records['qpls']
                             ]
-                            processing_data['created_qpls'] = today_qpls
                             
-                            app.logger.info(f"Updated processing data with real counts: opportunities={len(today_opportunities)}, contacts={len(today_contacts)}, accounts={len(today_accounts)}, products={len(today_products)}, qpls={len(today_qpls)}")
+                            app.logger.info(f"Updated processing data with real counts: opportunities={len(records['opportunities'])}, contacts={len(records['contacts'])}, accounts={len(records['accounts'])}, products={len(records['products'])}, qpls={len(records['qpls'])}")
                             
                         except Exception as db_error:
                             app.logger.error(f"Error getting actual created records: {db_error}")
@@ -3131,32 +3193,24 @@ def get_pdf_count():
             return jsonify({'count': 0, 'status': 'No directory'})
         
         try:
-            # First approach: direct globbing - combine and deduplicate
-            pdf_files_lower = list(to_process_dir.glob("*.pdf"))
-            pdf_files_upper = list(to_process_dir.glob("*.PDF"))
-            
-            # Combine and deduplicate by file path
-            all_pdfs = list(set(pdf_files_lower + pdf_files_upper))
-            pdf_count = len([f for f in all_pdfs if f.is_file()])
-                
-            # Add detailed information for debugging
-            import os
-            file_info = []
-            for pdf in all_pdfs:
-                if pdf.is_file():
-                    file_info.append({
-                        'name': pdf.name,
-                        'size': os.path.getsize(pdf) if os.path.exists(pdf) else 0
-                    })
+            # Single scandir pass; DirEntry caches the stat used for the size.
+            # os.access checks readability for this process, not just the owner bit
+            file_info = [
+                {
+                    'name': entry.name,
+                    'size': entry.stat().st_size,
+                    'readable': os.access(entry.path, os.R_OK)
+                }
+                for entry in iter_pdf_files(to_process_dir)
+            ]
             
             return jsonify({
-                'count': pdf_count, 
+                'count': len(file_info), 
                 'status': 'success',
                 'files': file_info
             })
         except Exception as e:
             # Fall back to a simpler approach
-            import os
             pdf_files = [f for f in os.listdir(str(to_process_dir)) 
                         if f.lower().endswith('.pdf')]
             return jsonify({
@@ -3182,8 +3236,7 @@ def load_pdfs():
             }), 404
             
         # Check if there are PDFs to process
-        pdf_files = list(to_process_dir.glob("*.pdf")) + list(to_process_dir.glob("*.PDF"))
-        if not pdf_files:
+        if not has_pdf_files(to_process_dir):
             return jsonify({
                 'success': True,
                 'message': 'No PDF files to process',
@@ -3239,10 +3292,14 @@ Double-click any opportunity in the table below to view full details."""
                     'updated_records': updated_records
                 }
                 
-                # Create ONE comprehensive review task with new title format
+                # Processing data rides along in an HTML comment that the task detail
+                # view strips for display; serialize it once, compactly, and create the
+                # task with the full description rather than creating then updating it;
+                # app.json goes through orjson when it is installed
+                processing_json = app.json.dumps(processing_data)
                 task_id = crm_data.create_task(
                     subject=f"Load PDF {process_date} Review",
-                    description=task_description,  # Keep clean user description
+                    description=f"{task_description}\n\n<!-- PROCESSING_DATA:{processing_json} -->",
                     status="Not Started",
                     priority="High",
                     type="Follow-up",
@@ -3251,12 +3308,6 @@ Double-click any opportunity in the table below to view full details."""
                     assigned_to="System Generated"
                 )
                 
-                # Store processing data separately in a custom processing_data field or handle differently
-                # For now, we'll append it to description but handle it properly in the template
-                current_task = crm_data.get_task_by_id(task_id)
-                updated_description = f"{task_description}\n\n<!-- PROCESSING_DATA:{json.dumps(processing_data)} -->"
-                crm_data.update_task(task_id, description=updated_description)
-                
                 # Link created opportunities to the task (commented out - method doesn't exist)
                 # for opp in created_opportunities:
                 #     if opp.get('id'):
@@ -3266,9 +3317,7 @@ Double-click any opportunity in the table below to view full details."""
                 #             app.logger.error(f"Error linking opportunity {opp['id']} to task {task_id}: {str(link_error)}")
                 
                 # Track task creation in results
-                if 'created_tasks' not in results:
-                    results['created_tasks'] = []
-                results['created_tasks'].append({
+                results.setdefault('created_tasks', []).append({
                     'id': task_id,
                     'subject': f"Load PDF {process_date} Review",
                     'type': 'PDF Processing Review',
@@ -3329,33 +3378,31 @@ def clear_all_data():
         
         cleared_count = 0
         cleared_tables = []
+        existing_tables = get_existing_tables()
         
-        # Clear each table
-        for table in tables_to_clear:
-            try:
-                # Check if table exists first
-                check_query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"
-                table_exists = crm_data.execute_query(check_query)
-                
-                if table_exists:
-                    # Clear the table
-                    result = crm_data.execute_update(f"DELETE FROM {table}", [])
-                    cleared_tables.append(f"{table} ({result} records)")
-                    cleared_count += result if result else 0
-                    app.logger.info(f"Cleared table '{table}': {result} records deleted")
-                else:
-                    app.logger.info(f"Table '{table}' does not exist, skipping")
+        # Clear each table; one transaction so the whole reset pays a single commit
+        with crm_data.transaction():
+            for table in tables_to_clear:
+                try:
+                    if table in existing_tables:
+                        # Clear the table
+                        result = crm_data.execute_update(f"DELETE FROM {table}", [])
+                        cleared_tables.append(f"{table} ({result} records)")
+                        cleared_count += result if result else 0
+                        app.logger.info(f"Cleared table '{table}': {result} records deleted")
+                    else:
+                        app.logger.info(f"Table '{table}' does not exist, skipping")
                     
-            except Exception as table_error:
-                app.logger.error(f"Error clearing table '{table}': {str(table_error)}")
-                # Continue with other tables even if one fails
+                except Exception as table_error:
+                    app.logger.error(f"Error clearing table '{table}': {str(table_error)}")
+                    # Continue with other tables even if one fails
         
-        # Reset auto-increment sequences (SQLite specific)
-        try:
-            crm_data.execute_update("DELETE FROM sqlite_sequence", [])
-            app.logger.info("Reset auto-increment sequences")
-        except Exception as seq_error:
-            app.logger.warning(f"Could not reset sequences: {str(seq_error)}")
+            # Reset auto-increment sequences (SQLite specific)
+            try:
+                crm_data.execute_update("DELETE FROM sqlite_sequence", [])
+                app.logger.info("Reset auto-increment sequences")
+            except Exception as seq_error:
+                app.logger.warning(f"Could not reset sequences: {str(seq_error)}")
         
         # Clear output files (CSV and JSON reports)
         files_deleted = 0
@@ -3446,34 +3493,32 @@ def database_cleanup():
             'email_responses'
         ]
         
-        # Clean selected tables in proper order
-        for table in table_order:
-            if table in tables_to_clean:
-                try:
-                    # Check if table exists first
-                    check_query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"
-                    table_exists = crm_data.execute_query(check_query)
-                    
-                    if table_exists:
-                        # Clear the table
-                        result = crm_data.execute_update(f"DELETE FROM {table}", [])
-                        cleared_tables.append(f"{table} ({result} records)")
-                        cleared_count += result if result else 0
-                        app.logger.info(f"Cleared table '{table}': {result} records deleted")
-                    else:
-                        app.logger.info(f"Table '{table}' does not exist, skipping")
+        # Clean selected tables in proper order, in one transaction
+        existing_tables = get_existing_tables()
+        with crm_data.transaction():
+            for table in table_order:
+                if table in tables_to_clean:
+                    try:
+                        if table in existing_tables:
+                            # Clear the table
+                            result = crm_data.execute_update(f"DELETE FROM {table}", [])
+                            cleared_tables.append(f"{table} ({result} records)")
+                            cleared_count += result if result else 0
+                            app.logger.info(f"Cleared table '{table}': {result} records deleted")
+                        else:
+                            app.logger.info(f"Table '{table}' does not exist, skipping")
                         
-                except Exception as table_error:
-                    app.logger.error(f"Error clearing table '{table}': {str(table_error)}")
-                    # Continue with other tables even if one fails
+                    except Exception as table_error:
+                        app.logger.error(f"Error clearing table '{table}': {str(table_error)}")
+                        # Continue with other tables even if one fails
         
-        # Reset auto-increment sequences if requested
-        if reset_sequences:
-            try:
-                crm_data.execute_update("DELETE FROM sqlite_sequence", [])
-                app.logger.info("Reset auto-increment sequences")
-            except Exception as seq_error:
-                app.logger.warning(f"Could not reset sequences: {str(seq_error)}")
+            # Reset auto-increment sequences if requested
+            if reset_sequences:
+                try:
+                    crm_data.execute_update("DELETE FROM sqlite_sequence", [])
+                    app.logger.info("Reset auto-increment sequences")
+                except Exception as seq_error:
+                    app.logger.warning(f"Could not reset sequences: {str(seq_error)}")
         
         # Clear files if requested
         if clean_processing_reports or clean_all_files:
@@ -3550,14 +3595,11 @@ def get_database_counts():
     try:
         tables = ['opportunities', 'accounts', 'contacts', 'products', 'projects', 'tasks', 'rfqs', 'interactions', 'qpls']
         counts = {}
+        existing_tables = get_existing_tables()
         
         for table in tables:
             try:
-                # Check if table exists first
-                check_query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'"
-                table_exists = crm_data.execute_query(check_query)
-                
-                if table_exists:
+                if table in existing_tables:
                     count_query = f"SELECT COUNT(*) as count FROM {table}"
                     result = crm_data.execute_query(count_query)
                     counts[table] = result[0]['count'] if result else 0
@@ -3603,29 +3645,31 @@ def clean_test_data():
         
         cleaned_count = 0
         
-        # Clean test accounts
-        for pattern in test_patterns:
-            try:
-                # Clean accounts with test patterns in name or email
-                query = "DELETE FROM accounts WHERE LOWER(name) LIKE ? OR LOWER(primary_email) LIKE ?"
-                result = crm_data.execute_update(query, [f'%{pattern}%', f'%{pattern}%'])
-                cleaned_count += result if result else 0
-                
-                # Clean contacts with test patterns
-                query = "DELETE FROM contacts WHERE LOWER(first_name) LIKE ? OR LOWER(last_name) LIKE ? OR LOWER(email) LIKE ?"
-                result = crm_data.execute_update(query, [f'%{pattern}%', f'%{pattern}%', f'%{pattern}%'])
-                cleaned_count += result if result else 0
-                
-            except Exception as pattern_error:
-                app.logger.error(f"Error cleaning pattern '{pattern}': {str(pattern_error)}")
+        like_patterns = [f'%{pattern}%' for pattern in test_patterns]
+        
+        # Clean test accounts; each DELETE runs once per pattern via executemany
+        try:
+            # Clean accounts with test patterns in name or email
+            query = "DELETE FROM accounts WHERE LOWER(name) LIKE ? OR LOWER(primary_email) LIKE ?"
+            result = crm_data.execute_many(query, [(like, like) for like in like_patterns])
+            cleaned_count += result if result > 0 else 0
+        except Exception as pattern_error:
+            app.logger.error(f"Error cleaning test accounts: {str(pattern_error)}")
+        
+        try:
+            # Clean contacts with test patterns
+            query = "DELETE FROM contacts WHERE LOWER(first_name) LIKE ? OR LOWER(last_name) LIKE ? OR LOWER(email) LIKE ?"
+            result = crm_data.execute_many(query, [(like, like, like) for like in like_patterns])
+            cleaned_count += result if result > 0 else 0
+        except Exception as pattern_error:
+            app.logger.error(f"Error cleaning test contacts: {str(pattern_error)}")
         
         # Clean opportunities with test NSNs or names
         try:
             test_nsns = ['0000000000000', '1111111111111', '9999999999999']  # Common test NSNs
-            for nsn in test_nsns:
-                query = "DELETE FROM opportunities WHERE nsn = ?"
-                result = crm_data.execute_update(query, [nsn])
-                cleaned_count += result if result else 0
+            query = "DELETE FROM opportunities WHERE nsn = ?"
+            result = crm_data.execute_many(query, [(nsn,) for nsn in test_nsns])
+            cleaned_count += result if result > 0 else 0
         except Exception as nsn_error:
             app.logger.error(f"Error cleaning test NSNs: {str(nsn_error)}")
         
@@ -3856,19 +3900,7 @@ def processing_reports():
     from pathlib import Path
     
     # Get processing statistics
-    stats = {
-        'processed': 0,
-        'skipped': 0
-    }
-    
-    # Count files in reviewed folders using config manager
-    reviewed_dir = config_manager.get_processed_dir()
-    if reviewed_dir.exists():
-        stats['processed'] = len(list(reviewed_dir.glob("*.pdf"))) + len(list(reviewed_dir.glob("*.PDF")))
-        
-        skipped_dir = reviewed_dir / "Skipped"
-        if skipped_dir.exists():
-            stats['skipped'] = len(list(skipped_dir.glob("*.pdf"))) + len(list(skipped_dir.glob("*.PDF")))
+    stats = get_reviewed_pdf_stats()
     
     # Get all report files using config manager
     output_dir = config_manager.get_output_dir()
@@ -3897,7 +3929,7 @@ def processing_reports():
                 else:
                     # Legacy format fallback
                     processed_count = len(report_data.get('processed_files', []))
-                    created_count = len([f for f in report_data.get('processed_files', []) if f.get('status') == 'processed'])
+                    created_count = sum(1 for f in report_data.get('processed_files', []) if f.get('status') == 'processed')
                     skipped_count = len(report_data.get('skipped_files', []))
                     errors_count = len(report_data.get('error_files', []))
                     updated_count = 0
@@ -3957,17 +3989,13 @@ def view_processing_report(filename):
         
         # Handle file-level created_records for processed files
         for file_data in report_data.get('processed_files', []):
-            if 'created_records' not in file_data:
-                file_data['created_records'] = 1 if file_data.get('status') == 'processed' else 0
-            if 'updated_records' not in file_data:
-                file_data['updated_records'] = 0
+            file_data.setdefault('created_records', 1 if file_data.get('status') == 'processed' else 0)
+            file_data.setdefault('updated_records', 0)
         
         # Handle skipped files
         for file_data in report_data.get('skipped_files', []):
-            if 'created_records' not in file_data:
-                file_data['created_records'] = 0
-            if 'updated_records' not in file_data:
-                file_data['updated_records'] = 0
+            file_data.setdefault('created_records', 0)
+            file_data.setdefault('updated_records', 0)
         
         # Fix missing created_records by loading actual data from the database
         # This handles cases where the processing report doesn't have complete created_records data
@@ -4050,19 +4078,21 @@ def get_processing_report_opportunities(filename):
         with open(report_file, 'r') as f:
             report_data = json.load(f)
         
-        # Get opportunity IDs from the report
-        opportunity_ids = []
+        # Get opportunity IDs from the report, de-duplicated in first-seen order
+        seen_ids = {}
         
         # From processed files
         for file_data in report_data.get('processed_files', []):
             if 'opportunity_id' in file_data:
-                opportunity_ids.append(file_data['opportunity_id'])
+                seen_ids[file_data['opportunity_id']] = None
         
         # From created records structure
         if 'created_records' in report_data and 'opportunities' in report_data['created_records']:
             for opp in report_data['created_records']['opportunities']:
-                if 'id' in opp and opp['id'] not in opportunity_ids:
-                    opportunity_ids.append(opp['id'])
+                if 'id' in opp:
+                    seen_ids[opp['id']] = None
+        
+        opportunity_ids = list(seen_ids)
         
         if not opportunity_ids:
             return jsonify({
@@ -4220,8 +4250,9 @@ def generate_vendor_emails_api(opportunity_id):
         # Generate emails for all vendors
         emails = email_automation.generate_bulk_rfq_emails(opportunity_id, vendor_list, template_name)
         
-        success_count = len([e for e in emails if 'error' not in e])
-        error_count = len([e for e in emails if 'error' in e])
+        # One pass for the errors; everything else succeeded
+        error_count = sum(1 for e in emails if 'error' in e)
+        success_count = len(emails) - error_count
         
         return jsonify({
             'success': True,
@@ -22,6 +22,8 @@ import importlib
 import json
 import shutil
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from google.colab import auth
 from googleapiclient.discovery import build
@@ -36,6 +38,15 @@ summary_dir = "/content/drive/MyDrive/Automation/Summary"
 webhook_url = "https://n8n.cdeprosperity.com/webhook/fc1edb04-07aa-40f5-9096-af0032692fea"
 credentials_path = '/content/drive/MyDrive/Code/client_secrets.json'
 
+# Reuse keep-alive connections to the webhook for the whole run; requests.Session
+# isn't documented as thread-safe, so each webhook worker thread gets its own
+webhook_sessions = threading.local()
+
+def get_webhook_session():
+    if not hasattr(webhook_sessions, 'session'):
+        webhook_sessions.session = requests.Session()
+    return webhook_sessions.session
+
 
 # In[4]:
 
@@ -51,12 +62,8 @@ drive_service = build('drive', 'v3')
 
 
 def extract_text_from_pdf(pdf_file):
-    text = ""
     with fitz.open(pdf_file) as doc:
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-    return text
+        return "".join(page.get_text("text") for page in doc)
 
 
 # In[6]:
@@ -575,22 +582,28 @@ def process_pdf(pdf_file):
 # In[30]:
 
 
-def send_to_webhook(data):
+def write_webhook_summary(data):
     json_data = json.dumps(data, indent=4)
     pdf_destination_folder = "/content/drive/MyDrive/Automation/" + data['nsn'] + "/" + data['request_number']
 
-    if not os.path.exists(pdf_destination_folder):
-        os.makedirs(pdf_destination_folder)
+    os.makedirs(pdf_destination_folder, exist_ok=True)
 
     summary_file = os.path.join(pdf_destination_folder, f"{data['request_number']}.txt")
 
     with open(summary_file, 'w') as f:
         f.write(json_data)
 
-    response = requests.post(webhook_url, json=data)
+
+def post_to_webhook(data):
+    response = get_webhook_session().post(webhook_url, json=data)
     print(f"Webhook Response: {response.status_code}")
 
 
+def send_to_webhook(data):
+    write_webhook_summary(data)
+    post_to_webhook(data)
+
+
 # In[31]:
 
 
@@ -600,8 +613,11 @@ def main(pdf_dir):
 
     csv_file_path = os.path.join(summary_dir, f"{today_str}_output.csv")
 
-    with open(csv_file_path, 'a', newline='', encoding='utf-8') as file:
+    # Webhook posts run in the background while the next PDF is parsed
+    with open(csv_file_path, 'a', newline='', encoding='utf-8') as file, \
+            ThreadPoolExecutor(max_workers=4) as webhook_pool:
         writer = csv.writer(file)
+        webhook_posts = []
 
         for file_name in os.listdir(pdf_dir):
             if file_name.lower().endswith(".pdf"):
@@ -617,7 +633,7 @@ def main(pdf_dir):
                   any(manufacturer.lower() in pdf_data['mfr'].lower() for manufacturer in ["Parker", "Monkey Monkey"])):
                     pdf_destination = f"/content/drive/MyDrive/Automation/{pdf_data['nsn']}/{pdf_data['request_number']}/"
                     if not os.path.exists(pdf_destination):
-                        os.makedirs(pdf_destination)
+                        os.makedirs(pdf_destination, exist_ok=True)
                         print("Made PDF Folder: " + pdf_destination)
                     move_files(pdf_file, pdf_destination)
                 else:
@@ -628,8 +644,14 @@ def main(pdf_dir):
                 writer.writerow(pdf_data.values())
                 print(pdf_data.values())
 
-                #send to webhook for n8n
-                send_to_webhook(pdf_data)
+                #send to webhook for n8n; the summary file is written here so only
+                #the network post runs on the pool
+                write_webhook_summary(pdf_data)
+                webhook_posts.append(webhook_pool.submit(post_to_webhook, dict(pdf_data)))
+
+        # Surface any webhook failures
+        for post in webhook_posts:
+            post.result()
 
 
 # In[32]:
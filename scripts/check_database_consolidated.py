@@ -10,6 +10,8 @@ import os
 import argparse
 from datetime import datetime
 
+from db_helpers import USER_TABLES_QUERY, connect_read_only
+
 def check_table_exists(cursor, table_name):
     """Check if a table exists in the database"""
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
@@ -17,7 +19,7 @@ def check_table_exists(cursor, table_name):
 
 def get_table_schema(cursor, table_name):
     """Get the schema information for a table"""
-    cursor.execute(f"PRAGMA table_info({table_name})")
+    cursor.execute("SELECT * FROM pragma_table_info(?)", (table_name,))
     return cursor.fetchall()
 
 def get_table_count(cursor, table_name):
@@ -28,16 +30,39 @@ def get_table_count(cursor, table_name):
     except sqlite3.OperationalError:
         return 0
 
+def get_table_counts(cursor, table_names):
+    """Get record counts for several tables in a single UNION ALL query"""
+    if not table_names:
+        return {}
+    sql = " UNION ALL ".join(
+        f"SELECT ? AS name, COUNT(*) AS count FROM \"{name}\"" for name in table_names
+    )
+    try:
+        cursor.execute(sql, list(table_names))
+        return {name: count for name, count in cursor.fetchall()}
+    except sqlite3.OperationalError:
+        return {name: get_table_count(cursor, name) for name in table_names}
+
 def check_foreign_keys(cursor, table_name):
     """Get foreign key information for a table"""
-    cursor.execute(f"PRAGMA foreign_key_list({table_name})")
+    cursor.execute("SELECT * FROM pragma_foreign_key_list(?)", (table_name,))
     return cursor.fetchall()
 
 def check_indexes(cursor, table_name):
     """Get index information for a table"""
-    cursor.execute(f"PRAGMA index_list({table_name})")
+    cursor.execute("SELECT * FROM pragma_index_list(?)", (table_name,))
     return cursor.fetchall()
 
+def format_schema_rows(schema):
+    """Format PRAGMA table_info rows as one block of aligned text"""
+    lines = []
+    for cid, name, col_type, not_null, default_value, pk in schema:
+        null_str = "NOT NULL" if not_null else "NULL"
+        default_str = str(default_value) if default_value is not None else ""
+        pk_str = "YES" if pk else ""
+        lines.append(f"{name:<20} {col_type:<15} {null_str:<8} {default_str:<15} {pk_str:<5}")
+    return "\n".join(lines)
+
 def analyze_database_structure(db_path, detailed=False, table_filter=None):
     """Analyze and display database structure"""
     
@@ -53,12 +78,16 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_read_only(db_path)
         cursor = conn.cursor()
         
         # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        all_tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(USER_TABLES_QUERY)
+        all_tables = [row[0] for row in cursor]
+        
+        # Hold one read transaction and count every table in one round trip
+        cursor.execute("BEGIN")
+        table_counts = get_table_counts(cursor, all_tables)
         
         if table_filter:
             tables = [t for t in all_tables if table_filter.lower() in t.lower()]
@@ -84,7 +113,7 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
         print("-" * 40)
         for table in expected_tables:
             if table in all_tables:
-                count = get_table_count(cursor, table)
+                count = table_counts[table]
                 print(f"✅ {table}: {count:,} records")
             else:
                 print(f"❌ {table}: MISSING")
@@ -97,7 +126,7 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
             print("=" * 60)
             
             # Record count
-            count = get_table_count(cursor, table)
+            count = table_counts[table]
             print(f"📊 Records: {count:,}")
             
             # Schema information
@@ -107,12 +136,7 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
             print(f"{'Column':<20} {'Type':<15} {'Null':<8} {'Default':<15} {'PK':<5}")
             print("-" * 63)
             
-            for col in schema:
-                cid, name, col_type, not_null, default_value, pk = col
-                null_str = "NOT NULL" if not_null else "NULL"
-                default_str = str(default_value) if default_value is not None else ""
-                pk_str = "YES" if pk else ""
-                print(f"{name:<20} {col_type:<15} {null_str:<8} {default_str:<15} {pk_str:<5}")
+            print(format_schema_rows(schema))
             
             if detailed:
                 # Foreign keys
@@ -149,10 +173,11 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
                     print(header)
                     print("-" * len(header))
                     
-                    # Display sample rows
-                    for row in sample_rows:
-                        row_str = " | ".join([str(val)[:15] if val is not None else "NULL" for val in row])
-                        print(row_str)
+                    # Display sample rows in a single write
+                    print("\n".join(
+                        " | ".join(str(val)[:15] if val is not None else "NULL" for val in row)
+                        for row in sample_rows
+                    ))
             
             print()
         
@@ -161,7 +186,7 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
         print("📈 DATABASE STATISTICS")
         print("=" * 80)
         
-        total_records = sum(get_table_count(cursor, table) for table in all_tables)
+        total_records = sum(table_counts.values())
         print(f"📊 Total Tables: {len(all_tables)}")
         print(f"📊 Total Records: {total_records:,}")
         print(f"📊 Database Size: {os.path.getsize(db_path):,} bytes")
@@ -187,6 +212,7 @@ def analyze_database_structure(db_path, detailed=False, table_filter=None):
                 for violation in fk_violations:
                     print(f"   • {violation}")
         
+        conn.commit()
         conn.close()
         
         print("\\n" + "=" * 80)
@@ -206,7 +232,7 @@ def quick_health_check(db_path):
     print("=" * 40)
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_read_only(db_path)
         cursor = conn.cursor()
         
         # Essential tables and their expected relationships
@@ -275,19 +301,21 @@ def main():
         
         try:
             # Compare table counts
-            conn1 = sqlite3.connect(db1_path)
-            conn2 = sqlite3.connect(db2_path)
+            conn1 = connect_read_only(db1_path)
+            conn2 = connect_read_only(db2_path)
             cursor1 = conn1.cursor()
             cursor2 = conn2.cursor()
             
             # Get all tables from both databases
-            cursor1.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-            tables1 = set(row[0] for row in cursor1.fetchall())
+            cursor1.execute(USER_TABLES_QUERY)
+            tables1 = set(row[0] for row in cursor1)
             
-            cursor2.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-            tables2 = set(row[0] for row in cursor2.fetchall())
+            cursor2.execute(USER_TABLES_QUERY)
+            tables2 = set(row[0] for row in cursor2)
             
             all_tables = tables1.union(tables2)
+            counts1 = get_table_counts(cursor1, sorted(tables1))
+            counts2 = get_table_counts(cursor2, sorted(tables2))
             
             print("📊 TABLE COMPARISON:")
             print("-" * 50)
@@ -295,8 +323,8 @@ def main():
             print("-" * 50)
             
             for table in sorted(all_tables):
-                count1 = get_table_count(cursor1, table) if table in tables1 else 0
-                count2 = get_table_count(cursor2, table) if table in tables2 else 0
+                count1 = counts1.get(table, 0)
+                count2 = counts2.get(table, 0)
                 diff = count2 - count1
                 
                 status = ""
@@ -74,6 +74,11 @@ def clear_business_data(auto_confirm=False, db_path='data/crm.db'):
         print("\\n🗑️  CLEARING BUSINESS DATA...")
         print("-" * 40)
         
+        # The clear is a single transaction and safe to rerun if interrupted, so
+        # skip the fsyncs for this connection; journaling itself stays on
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        
         # Clear tables in order (handling foreign key constraints)
         clear_order = [
             'project_tasks',
@@ -5,13 +5,13 @@ Combines functionality from database_analysis.py and db_analysis.py
 Analyzes database structure, checks for duplicates, and generates human-readable documentation
 """
 
-import sqlite3
-import json
 import argparse
 import os
 from datetime import datetime
 from pathlib import Path
 
+from db_helpers import USER_TABLES_QUERY, connect_read_only
+
 def analyze_database_comprehensive(db_path='data/crm.db', detailed=True):
     """Comprehensive database analysis with optional detailed output"""
     if detailed:
@@ -24,12 +24,12 @@ def analyze_database_comprehensive(db_path='data/crm.db', detailed=True):
         print(f"❌ Database file not found: {db_path}")
         return None, 0
     
-    conn = sqlite3.connect(db_path)
+    conn = connect_read_only(db_path)
     cursor = conn.cursor()
     
     # Get all tables
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-    tables = [row[0] for row in cursor.fetchall()]
+    cursor.execute(USER_TABLES_QUERY)
+    tables = [row[0] for row in cursor]
     
     if detailed:
         print(f"📊 DATABASE OVERVIEW")
@@ -55,7 +55,7 @@ def analyze_database_comprehensive(db_path='data/crm.db', detailed=True):
             print("-" * 50)
         
         # Get table info
-        cursor.execute(f"PRAGMA table_info({table})")
+        cursor.execute("SELECT * FROM pragma_table_info(?)", (table,))
         columns = cursor.fetchall()
         
         # Get row count
@@ -64,7 +64,7 @@ def analyze_database_comprehensive(db_path='data/crm.db', detailed=True):
         total_records += row_count
         
         # Get foreign keys
-        cursor.execute(f"PRAGMA foreign_key_list({table})")
+        cursor.execute("SELECT * FROM pragma_foreign_key_list(?)", (table,))
         foreign_keys = cursor.fetchall()
         
         # Build column information
@@ -132,7 +132,7 @@ def check_data_integrity(db_path='data/crm.db'):
         print(f"❌ Database file not found: {db_path}")
         return []
     
-    conn = sqlite3.connect(db_path)
+    conn = connect_read_only(db_path)
     cursor = conn.cursor()
     
     issues = []
@@ -174,12 +174,12 @@ def check_unused_data(db_path='data/crm.db'):
         print(f"❌ Database file not found: {db_path}")
         return [], []
     
-    conn = sqlite3.connect(db_path)
+    conn = connect_read_only(db_path)
     cursor = conn.cursor()
     
     # Get tables with zero records
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-    tables = [row[0] for row in cursor.fetchall()]
+    cursor.execute(USER_TABLES_QUERY)
+    tables = [row[0] for row in cursor]
     
     empty_tables = []
     low_usage_tables = []
@@ -211,21 +211,28 @@ def quick_db_check(db_path='data/crm.db'):
         return
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_read_only(db_path)
         cursor = conn.cursor()
         
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        cursor.execute(USER_TABLES_QUERY)
+        tables = [row[0] for row in cursor]
         print(f"Tables in {db_path}:", tables)
         
-        # Check counts for key tables
+        # Check counts for key tables in a single UNION ALL round-trip
         key_tables = ['tasks', 'opportunities', 'projects', 'interactions', 'rfqs', 'accounts', 'contacts', 'products']
+        existing = set(tables)
+        present = [table for table in key_tables if table in existing]
+        counts = {}
+        if present:
+            cursor.execute(
+                " UNION ALL ".join(f'SELECT ?, COUNT(*) FROM "{table}"' for table in present),
+                present
+            )
+            counts = dict(cursor)
         for table in key_tables:
-            try:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                print(f"{table}: {count} records")
-            except:
+            if table in counts:
+                print(f"{table}: {counts[table]} records")
+            else:
                 print(f"{table}: table doesn't exist")
         
         conn.close()
@@ -303,7 +310,7 @@ def main():
     elif args.structure:
         # Structure check similar to check_db_structure.py
         if os.path.exists(args.db):
-            conn = sqlite3.connect(args.db)
+            conn = connect_read_only(args.db)
             cursor = conn.cursor()
             
             print(f"Looking for database at: {args.db}")
@@ -313,19 +320,20 @@ def main():
             try:
                 cursor.execute('PRAGMA table_info(opportunities)')
                 print('\\nOpportunities table columns:')
-                for row in cursor.fetchall():
+                for row in cursor:
                     print(f'  {row[1]} - {row[2]}')
                 
                 # Get a sample opportunity
                 cursor.execute('SELECT * FROM opportunities LIMIT 1')
-                columns = [description[0] for description in cursor.description]
-                sample = cursor.fetchone()
+                columns = tuple(description[0] for description in cursor.description)
                 
                 print('\\nSample opportunity data:')
-                if sample:
-                    for i, col in enumerate(columns):
-                        print(f'  {col}: {sample[i]}')
-                else:
+                found = False
+                for sample in cursor:
+                    found = True
+                    for col, value in zip(columns, sample):
+                        print(f'  {col}: {value}')
+                if not found:
                     print('  No opportunities found in database')
             except Exception as e:
                 print(f'Error analyzing opportunities table: {e}')
@@ -7,7 +7,6 @@ Advanced database maintenance with backup, cleanup, and optimization features.
 
 import sqlite3
 import os
-import shutil
 import argparse
 from datetime import datetime
 
@@ -17,16 +16,41 @@ def create_backup(db_path, backup_suffix="_backup"):
     backup_path = f"{db_path}{backup_suffix}_{timestamp}.db"
     
     try:
-        shutil.copy2(db_path, backup_path)
+        # The backup API copies a consistent snapshot, including pages still in the WAL file
+        source = sqlite3.connect(db_path)
+        try:
+            target = sqlite3.connect(backup_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
         print(f"✅ Backup created: {backup_path}")
         return backup_path
     except Exception as e:
         print(f"❌ Failed to create backup: {e}")
         return None
 
+def load_table_columns(cursor):
+    """Map each table to its set of column names with one catalog scan"""
+    cursor.execute("""
+        SELECT m.name, p.name FROM sqlite_master m, pragma_table_info(m.name) p
+        WHERE m.type = 'table'
+    """)
+    columns = {}
+    for table, column in cursor:
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+def missing_columns(columns, table, *names):
+    """Return the names not present on table (all of them if the table is missing)"""
+    return [name for name in names if name not in columns.get(table, ())]
+
 def analyze_database_issues(cursor):
     """Analyze database for common issues"""
     issues = []
+    columns = load_table_columns(cursor)
     
     print("🔍 ANALYZING DATABASE ISSUES...")
     print("-" * 40)
@@ -42,6 +66,11 @@ def analyze_database_issues(cursor):
     ]
     
     for child_table, child_col, parent_table, parent_col, description in orphan_checks:
+        missing = ([f"{child_table}.{name}" for name in missing_columns(columns, child_table, child_col)]
+                   + [f"{parent_table}.{name}" for name in missing_columns(columns, parent_table, parent_col)])
+        if missing:
+            print(f"⚪ {description}: Unable to check (missing {', '.join(missing)})")
+            continue
         try:
             query = f"""
             SELECT COUNT(*) FROM {child_table} 
@@ -68,6 +97,9 @@ def analyze_database_issues(cursor):
     ]
     
     for table, column, description in duplicate_checks:
+        if missing_columns(columns, table, column):
+            print(f"⚪ {description}: Unable to check (missing {table}.{column})")
+            continue
         try:
             query = f"""
             SELECT COUNT(*) FROM (
@@ -97,6 +129,9 @@ def analyze_database_issues(cursor):
     ]
     
     for table, column, description in null_checks:
+        if missing_columns(columns, table, column):
+            print(f"⚪ {description}: Unable to check (missing {table}.{column})")
+            continue
         try:
             query = f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL OR {column} = ''"
             cursor.execute(query)
@@ -119,6 +154,7 @@ def fix_orphaned_records(cursor, fix_mode="report"):
     print("-" * 50)
     
     fixes_applied = 0
+    columns = load_table_columns(cursor)
     
     # Define fixes for orphaned records
     orphan_fixes = [
@@ -145,6 +181,10 @@ def fix_orphaned_records(cursor, fix_mode="report"):
             else:
                 continue
             
+            if missing_columns(columns, child_table, child_col):
+                print(f"⚪ Skipped: {description} (missing {child_table}.{child_col})")
+                continue
+            
             check_query = f"""
             SELECT COUNT(*) FROM {child_table} 
             WHERE {child_col} IS NOT NULL 
@@ -229,8 +269,10 @@ def cleanup_database(db_path, mode="analyze", create_backup_flag=True):
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Enable foreign key constraints
+        # Enable foreign key constraints; WAL with NORMAL sync avoids an fsync per statement
         cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
         
         # Analyze issues
         issues = analyze_database_issues(cursor)
@@ -249,7 +291,8 @@ def cleanup_database(db_path, mode="analyze", create_backup_flag=True):
                 print("APPLYING FIXES")
                 print("=" * 60)
                 
-                # Fix orphaned records
+                # Fix orphaned records; checks and fixes share one write transaction
+                cursor.execute("BEGIN IMMEDIATE")
                 fixes = fix_orphaned_records(cursor, "fix")
                 total_fixes += fixes
                 
@@ -0,0 +1,24 @@
+"""
+Shared Database Helpers
+Connection setup and catalog queries used by the database inspection scripts.
+"""
+
+import sqlite3
+
+# User tables only; SQLite's internal sqlite_* tables are filtered in SQL
+USER_TABLES_QUERY = (
+    "SELECT name FROM sqlite_master "
+    "WHERE type='table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY name"
+)
+
+# Read-only inspection: refuse writes and favour mmap/page cache over read() calls
+READ_ONLY_PRAGMAS = (
+    "PRAGMA query_only=ON; PRAGMA mmap_size=268435456; "
+    "PRAGMA cache_size=-65536; PRAGMA temp_store=MEMORY;"
+)
+
+def connect_read_only(db_path):
+    """Open a database connection tuned for read-only inspection; the caller closes it"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.executescript(READ_ONLY_PRAGMAS)
+    return conn
@@ -29,9 +29,9 @@ COMMAND LINE USAGE:
 
 FILE STRUCTURE:
 ├── app.py                      # Main application entry point
+├── crm_app.py                  # Flask web application
 ├── src/                        # Source code
 │   ├── core/                   # Core CRM modules
-│   │   ├── crm_app.py         # Flask web application
 │   │   ├── crm_data.py        # Data access layer
 │   │   ├── crm_database.py    # Database schema
 │   │   └── crm_automation.py  # Business logic
@@ -112,7 +112,8 @@ REQUIREMENTS:
 - No internet connection required
 """
 
-import subprocess
+import os
+import socket
 import sys
 import time
 import threading
@@ -121,6 +122,11 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Web server address
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5000
+SERVER_URL = f'http://localhost:{SERVER_PORT}'
+
 def check_setup():
     """Check if system is properly set up"""
     base_dir = Path(__file__).parent.parent
@@ -128,59 +134,80 @@ def check_setup():
         'src/core/crm_database.py',
         'src/core/crm_data.py', 
         'src/core/crm_automation.py',
-        'src/core/crm_app.py',
+        'app.py',
+        'crm_app.py',
         'src/pdf/dibbs_crm_processor.py'
     ]
     
-    missing = []
-    for file in required_files:
-        if not (base_dir / file).exists():
-            missing.append(file)
+    # List each directory once rather than stat()ing every file
+    present = set()
+    for directory in {Path(file).parent for file in required_files}:
+        try:
+            with os.scandir(base_dir / directory) as entries:
+                present.update((directory / entry.name).as_posix() for entry in entries if entry.is_file())
+        except OSError:
+            continue
     
-    if missing:
-        print("Missing required files:")
-        for file in missing:
+    if present.issuperset(required_files):
+        return True
+    
+    print("Missing required files:")
+    for file in required_files:
+        if file not in present:
             print(f"  - {file}")
-        print("\nPlease ensure all files are in the correct directory structure.")
-        return False
+    print("\nPlease ensure all files are in the correct directory structure.")
+    return False
+
+def wait_for_server(host=SERVER_HOST, port=SERVER_PORT, timeout=5.0, interval=0.1):
+    """Wait until the web server accepts connections, up to timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=interval).close()
+            return True
+        except OSError:
+            time.sleep(interval)
+    return False
+
+def open_browser_when_ready():
+    """Open the web interface once the server is accepting connections"""
+    if not wait_for_server():
+        print("⚠ Server did not respond within 5 seconds, opening browser anyway...")
     
-    return True
+    import webbrowser
+    webbrowser.open(SERVER_URL)
 
 def start_web_interface():
     """Start the web interface"""
     try:
         print("Starting CRM web interface...")
-        base_dir = Path(__file__).parent.parent
-        app_path = base_dir / 'app.py'
         
-        if app_path.exists():
-            # Start the main app.py (preferred entry point)
-            subprocess.Popen([sys.executable, str(app_path)])
-        else:
-            # Fallback to direct crm_app.py
-            crm_app_path = base_dir / 'crm_app.py'
-            if crm_app_path.exists():
-                subprocess.Popen([sys.executable, str(crm_app_path)])
-            else:
-                print("Error: Neither app.py nor crm_app.py found. Please run from project root.")
-                return
-        time.sleep(3)  # Give it time to start
+        # Serve the Flask app in this process rather than spawning a second
+        # interpreter that re-imports Flask, PyMuPDF and the CRM modules; app.py's
+        # load_app applies the same configuration as running python app.py
+        try:
+            from app import load_app
+            app = load_app()
+        except ImportError as e:
+            print(f"Error: Could not import the CRM app ({e}). Please run from project root.")
+            return
+        from werkzeug.serving import make_server
         
-        # Open the webpage
-        import webbrowser
-        webbrowser.open('http://localhost:5000')
+        server = make_server(SERVER_HOST, SERVER_PORT, app, threaded=True)
+        threading.Thread(target=open_browser_when_ready, daemon=True).start()
         
-        print("✓ CRM web interface started at http://localhost:5000")
+        print(f"✓ CRM web interface started at {SERVER_URL}")
         print("✓ Opening webpage in your default browser...")
         print("\nPress Ctrl+C to stop the server when done.")
         
-        # Keep the script running
+        # Serve until interrupted
         try:
-            while True:
-                time.sleep(1)
+            server.serve_forever()
         except KeyboardInterrupt:
             print("\n\nShutting down CRM system...")
             return True
+        finally:
+            server.server_close()
     except Exception as e:
         print(f"✗ Error starting web interface: {e}")
         return False
@@ -5,7 +5,6 @@ Validates that all configuration and paths are properly set up
 """
 
 import sys
-import json
 from pathlib import Path
 
 def validate_config():
@@ -6,12 +6,26 @@ Centralized configuration management for the DLA CRM application.
 Handles loading configuration files, managing paths, and environment settings.
 """
 
+import functools
 import json
 import os
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional, Union
 
+@functools.lru_cache(maxsize=8)
+def _parse_json_file(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a JSON file; the cache key changes whenever the file is rewritten"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def read_json_file(path: Union[str, Path]) -> Dict[str, Any]:
+    """Load a JSON file, re-parsing it only when its mtime or size changes on disk"""
+    # Size is part of the key because coarse-mtime filesystems can keep the same
+    # timestamp across a quick rewrite
+    st = os.stat(path)
+    return dict(_parse_json_file(str(path), st.st_mtime_ns, st.st_size))
+
 class ConfigManager:
     """Manages application configuration files and settings"""
     
@@ -20,6 +34,7 @@ class ConfigManager:
         self.config_dir = self.base_dir / 'config'
         self.data_dir = self.base_dir / 'data'
         self._config_cache = {}
+        self._email_config_path = None
         self._setup_environment()
         
     def _setup_environment(self):
@@ -81,20 +96,29 @@ class ConfigManager:
         settings.update(env_settings)
         return settings
     
+    def get_email_config_path(self) -> Optional[Path]:
+        """Locate the email configuration file, remembering where it was found"""
+        if self._email_config_path is None:
+            # Try multiple possible locations
+            for possible_path in [
+                self.base_dir / 'src' / 'email_automation' / 'email_config.json',
+                self.base_dir / 'src' / 'email' / 'email_config.json',
+                self.config_dir / 'email_config.json'
+            ]:
+                if possible_path.exists():
+                    self._email_config_path = possible_path
+                    break
+        return self._email_config_path
+    
     def load_email_config(self) -> Dict[str, Any]:
         """Load email configuration"""
-        # Try multiple possible locations
-        for possible_path in [
-            self.base_dir / 'src' / 'email_automation' / 'email_config.json',
-            self.base_dir / 'src' / 'email' / 'email_config.json',
-            self.config_dir / 'email_config.json'
-        ]:
-            if possible_path.exists():
-                try:
-                    with open(possible_path, 'r') as f:
-                        return json.load(f)
-                except (json.JSONDecodeError, IOError) as e:
-                    logging.error(f"Error loading email config from {possible_path}: {e}")
+        config_path = self.get_email_config_path()
+        if config_path:
+            try:
+                with open(config_path, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                logging.error(f"Error loading email config from {config_path}: {e}")
         
         return {}
     
@@ -154,6 +178,7 @@ class ConfigManager:
     def clear_cache(self):
         """Clear the configuration cache"""
         self._config_cache.clear()
+        self._email_config_path = None
 
 # Create global instance
 config_manager = ConfigManager()
@@ -13,9 +13,16 @@ from core import crm_data
 
 # Create module reference for backward compatibility  
 crm_data = crm_data.crm_data
+from collections import Counter
 from datetime import datetime, date, timedelta
 import re
 
+# Settings that the qualification rules are built from
+QUALIFICATION_SETTING_KEYS = (
+    'min_delivery_days', 'iso_required', 'sampling_required', 'inspection_point',
+    'manufacturer_filter', 'fsc_filter', 'packaging_filter'
+)
+
 class CRMAutomation:
     
     def __init__(self):
@@ -26,6 +33,17 @@ class CRMAutomation:
             'account_matching': self.match_or_create_account,
             'contact_matching': self.match_or_create_contact
         }
+        self._processor = None
+        self._qualification_rules = None
+        self._qualification_rules_key = None
+    
+    def get_filter_settings(self):
+        """Get current PDF filter settings from the shared DIBBs processor"""
+        if self._processor is None:
+            # Importing the module already builds its dibbs_processor; use that one
+            from pdf.dibbs_crm_processor import dibbs_processor
+            self._processor = dibbs_processor
+        return self._processor.get_filter_settings()
     
     def process_dibbs_solicitation(self, dibbs_data):
         """Main automation workflow for processing DIBBs DLA solicitation data"""
@@ -40,9 +58,7 @@ class CRMAutomation:
         is_qualified = self.qualify_opportunity(dibbs_data)
         
         # 4. Auto-create opportunity if qualified and setting is enabled
-        from pdf.dibbs_crm_processor import DIBBsCRMProcessor
-        processor = DIBBsCRMProcessor()
-        settings = processor.get_filter_settings()
+        settings = self.get_filter_settings()
         
         opportunity_id = None
         if is_qualified and not dibbs_data.get('skipped') and settings.get('auto_create_opportunities', True):
@@ -58,48 +74,49 @@ class CRMAutomation:
             'qualified': is_qualified
         }
     
+    def get_qualification_rules(self, settings):
+        """Build the qualification rules from settings, rebuilding only when the settings change"""
+        key = tuple(settings.get(name) for name in QUALIFICATION_SETTING_KEYS)
+        if key != self._qualification_rules_key:
+            # Configuration-based qualification rules from settings
+            self._qualification_rules = {
+                'min_delivery_days': settings.get('min_delivery_days', 120),
+                # Solicitation fields that must match exactly (ISO, sampling, inspection point)
+                'required_fields': (
+                    ('iso', settings.get('iso_required', 'NO')),
+                    ('sampling', settings.get('sampling_required', 'NO')),
+                    ('inspection_point', settings.get('inspection_point', 'DESTINATION'))
+                ),
+                # Manufacturers are lowercased once here rather than per solicitation
+                'preferred_manufacturers': tuple(m.strip().lower() for m in settings.get('manufacturer_filter', '').split('\n') if m.strip()),
+                'excluded_fsc': frozenset(),  # Add FSCs to exclude if needed
+                'preferred_fsc': frozenset(f.strip() for f in settings.get('fsc_filter', '').split('\n') if f.strip()),
+                'excluded_packaging_types': frozenset(),  # Add packaging types to exclude
+                'preferred_packaging_types': frozenset(p.strip() for p in settings.get('packaging_filter', '').split('\n') if p.strip()),
+                'min_quantity': 1
+            }
+            self._qualification_rules_key = key
+        return self._qualification_rules
+    
     def qualify_opportunity(self, dibbs_data):
         """Determine if DLA solicitation meets qualification criteria"""
         
         # Get settings from dibbs_crm_processor
-        from pdf.dibbs_crm_processor import DIBBsCRMProcessor
-        processor = DIBBsCRMProcessor()
-        settings = processor.get_filter_settings()
-        
-        # Configuration-based qualification rules from settings
-        qualification_rules = {
-            'min_delivery_days': settings.get('min_delivery_days', 120),
-            'required_iso': settings.get('iso_required', 'NO'),
-            'required_sampling': settings.get('sampling_required', 'NO'),
-            'required_inspection_point': settings.get('inspection_point', 'DESTINATION'),
-            'preferred_manufacturers': [m.strip() for m in settings.get('manufacturer_filter', '').split('\n') if m.strip()],
-            'excluded_fsc': [],  # Add FSCs to exclude if needed
-            'preferred_fsc': [f.strip() for f in settings.get('fsc_filter', '').split('\n') if f.strip()],
-            'excluded_packaging_types': [],  # Add packaging types to exclude
-            'preferred_packaging_types': [p.strip() for p in settings.get('packaging_filter', '').split('\n') if p.strip()],
-            'min_quantity': 1
-        }
+        settings = self.get_filter_settings()
+        qualification_rules = self.get_qualification_rules(settings)
         
         # Check delivery days
         delivery_days = dibbs_data.get('delivery_days')
         if delivery_days and int(delivery_days) < qualification_rules['min_delivery_days']:
             return False
         
-        # Check ISO requirement
-        if dibbs_data.get('iso') != qualification_rules['required_iso']:
-            return False
-        
-        # Check sampling requirement
-        if dibbs_data.get('sampling') != qualification_rules['required_sampling']:
-            return False
-        
-        # Check inspection point
-        if dibbs_data.get('inspection_point') != qualification_rules['required_inspection_point']:
+        # Check ISO, sampling and inspection point requirements
+        if not all(dibbs_data.get(field) == value for field, value in qualification_rules['required_fields']):
             return False
         
         # Check manufacturer preference
         manufacturer = dibbs_data.get('mfr', '').lower()
-        if not any(pref_mfr.lower() in manufacturer for pref_mfr in qualification_rules['preferred_manufacturers']):
+        if not any(pref_mfr in manufacturer for pref_mfr in qualification_rules['preferred_manufacturers']):
             return False
         
         # Check quantity
@@ -220,9 +237,7 @@ class CRMAutomation:
         opportunity_name = f"{request_number}"
         
         # Check for duplicates
-        from pdf.dibbs_crm_processor import DIBBsCRMProcessor
-        processor = DIBBsCRMProcessor()
-        settings = processor.get_filter_settings()
+        settings = self.get_filter_settings()
         
         if settings.get('skip_duplicates', True):
             existing_opps = crm_data.execute_query(
@@ -269,9 +284,7 @@ class CRMAutomation:
         """Auto-create opportunity for qualified RFQs"""
         
         # Check for duplicate opportunities if setting is enabled
-        from pdf.dibbs_crm_processor import DIBBsCRMProcessor
-        processor = DIBBsCRMProcessor()
-        settings = processor.get_filter_settings()
+        settings = self.get_filter_settings()
         
         request_number = dibbs_data.get('request_number', 'Unknown')
         
@@ -368,74 +381,78 @@ class CRMAutomation:
         else:
             close_date_obj = date.today() + timedelta(days=30)
         
-        # Task 1: Review RFQ (due within 1 day)
-        review_due = date.today() + timedelta(days=1)
-        crm_data.create_task(
-            subject=f"Review RFQ {request_number}",
-            description=f"Review qualification and determine bid strategy for RFQ {request_number}",
-            type='Research',
-            priority='High',
-            due_date=review_due,
-            status='Not Started',
-            related_to_type='RFQ',
-            related_to_id=rfq_id,
-            assigned_to='Sales Team'
-        )
-        
-        # Task 2: Source products (due 3 days before close)
-        sourcing_due = close_date_obj - timedelta(days=3)
-        if sourcing_due > date.today():
+        # Create every follow-on task in one commit
+        with crm_data.transaction():
+            # Task 1: Review RFQ (due within 1 day)
+            review_due = date.today() + timedelta(days=1)
             crm_data.create_task(
-                subject=f"Source products for {request_number}",
-                description=f"Find suppliers and get pricing for NSN {dibbs_data.get('nsn', '')}",
+                subject=f"Review RFQ {request_number}",
+                description=f"Review qualification and determine bid strategy for RFQ {request_number}",
                 type='Research',
-                priority='Normal',
-                due_date=sourcing_due,
-                status='Not Started',
-                related_to_type='RFQ',
-                related_to_id=rfq_id,
-                assigned_to='Procurement Team'
-            )
-        
-        # Task 3: Prepare quote (due 1 day before close)
-        quote_due = close_date_obj - timedelta(days=1)
-        if quote_due > date.today():
-            crm_data.create_task(
-                subject=f"Prepare quote for {request_number}",
-                description=f"Compile final quote and submit for RFQ {request_number}",
-                type='Quote',
                 priority='High',
-                due_date=quote_due,
+                due_date=review_due,
                 status='Not Started',
                 related_to_type='RFQ',
                 related_to_id=rfq_id,
                 assigned_to='Sales Team'
             )
         
-        # If opportunity created, add follow-up task
-        if opportunity_id:
-            followup_due = close_date_obj + timedelta(days=7)
-            crm_data.create_task(
-                subject=f"Follow up on RFQ {request_number} results",
-                description=f"Check award status and follow up with buyer",
-                type='Follow-up',
-                priority='Normal',
-                due_date=followup_due,
-                status='Not Started',
-                related_to_type='Opportunity',
-                related_to_id=opportunity_id,
-                assigned_to='Sales Team'
-            )
+            # Task 2: Source products (due 3 days before close)
+            sourcing_due = close_date_obj - timedelta(days=3)
+            if sourcing_due > date.today():
+                crm_data.create_task(
+                    subject=f"Source products for {request_number}",
+                    description=f"Find suppliers and get pricing for NSN {dibbs_data.get('nsn', '')}",
+                    type='Research',
+                    priority='Normal',
+                    due_date=sourcing_due,
+                    status='Not Started',
+                    related_to_type='RFQ',
+                    related_to_id=rfq_id,
+                    assigned_to='Procurement Team'
+                )
+        
+            # Task 3: Prepare quote (due 1 day before close)
+            quote_due = close_date_obj - timedelta(days=1)
+            if quote_due > date.today():
+                crm_data.create_task(
+                    subject=f"Prepare quote for {request_number}",
+                    description=f"Compile final quote and submit for RFQ {request_number}",
+                    type='Quote',
+                    priority='High',
+                    due_date=quote_due,
+                    status='Not Started',
+                    related_to_type='RFQ',
+                    related_to_id=rfq_id,
+                    assigned_to='Sales Team'
+                )
+        
+            # If opportunity created, add follow-up task
+            if opportunity_id:
+                followup_due = close_date_obj + timedelta(days=7)
+                crm_data.create_task(
+                    subject=f"Follow up on RFQ {request_number} results",
+                    description=f"Check award status and follow up with buyer",
+                    type='Follow-up',
+                    priority='Normal',
+                    due_date=followup_due,
+                    status='Not Started',
+                    related_to_type='Opportunity',
+                    related_to_id=opportunity_id,
+                    assigned_to='Sales Team'
+                )
     
-    def calculate_sales_metrics(self):
+    def calculate_sales_metrics(self, overdue_tasks=None):
         """Calculate key sales metrics and KPIs"""
         
         metrics = {}
         
-        # RFQ Metrics
-        total_rfqs = len(crm_data.get_rfqs())
-        qualified_rfqs = len(crm_data.get_rfqs({'status': 'Qualified'}))
-        won_rfqs = len(crm_data.get_rfqs({'status': 'Won'}))
+        # RFQ Metrics (one fetch, counted by status in Python)
+        rfqs = crm_data.get_rfqs()
+        rfq_status_counts = Counter(rfq['status'] for rfq in rfqs)
+        total_rfqs = len(rfqs)
+        qualified_rfqs = rfq_status_counts['Qualified']
+        won_rfqs = rfq_status_counts['Won']
         
         metrics['rfq_qualification_rate'] = (qualified_rfqs / total_rfqs * 100) if total_rfqs > 0 else 0
         metrics['rfq_win_rate'] = (won_rfqs / qualified_rfqs * 100) if qualified_rfqs > 0 else 0
@@ -451,7 +468,8 @@ class CRMAutomation:
         metrics['total_won_value'] = sum((opp['amount'] if opp['amount'] is not None else 0) for opp in won_opps)
         
         # Task Metrics
-        overdue_tasks = crm_data.get_tasks({'due_date_range': 'overdue'})
+        if overdue_tasks is None:
+            overdue_tasks = crm_data.get_tasks({'due_date_range': 'overdue'})
         pending_tasks = crm_data.get_tasks({'status': 'Not Started'})
         
         metrics['overdue_tasks'] = len(overdue_tasks)
@@ -463,10 +481,11 @@ class CRMAutomation:
         """Get data for daily dashboard view"""
         
         today = date.today()
+        overdue_tasks = crm_data.get_tasks({'due_date_range': 'overdue'})
         
         dashboard = {
             'today_tasks': crm_data.get_tasks({'due_date_range': 'today'}),
-            'overdue_tasks': crm_data.get_tasks({'due_date_range': 'overdue'}),
+            'overdue_tasks': overdue_tasks,
             'this_week_tasks': crm_data.get_tasks({'due_date_range': 'this_week'}),
             'next_week_tasks': crm_data.get_tasks({'due_date_range': 'next_week'}),
             'new_rfqs': crm_data.get_rfqs({'status': 'New'}, limit=10),
@@ -483,7 +502,7 @@ class CRMAutomation:
                 "SELECT * FROM opportunities ORDER BY created_date DESC LIMIT 6"
             ),
             'recent_interactions': crm_data.get_interactions(limit=5),
-            'metrics': self.calculate_sales_metrics()
+            'metrics': self.calculate_sales_metrics(overdue_tasks)
         }
         
         return dashboard
@@ -4,6 +4,40 @@
 from .crm_database import db
 from datetime import datetime, date
 import json
+import re
+
+# Next stage for each opportunity stage (used by advance_opportunity_stage)
+STAGE_PROGRESSION = {
+    'Prospecting': 'RFQ Requested',
+    'RFQ Requested': 'RFQ Received', 
+    'RFQ Received': 'Submit Bid',
+    'Submit Bid': 'Project Started',
+    'Project Started': 'Project Started'  # Final stage
+}
+
+# Default interaction durations in minutes, matched by substring of the type
+DEFAULT_INTERACTION_DURATIONS = (
+    ('call', 15),
+    ('phone', 15),
+    ('meeting', 60),
+    ('email', 5),
+    ('demo', 90),
+    ('presentation', 60),
+    ('follow-up', 10)
+)
+
+# Subject keywords marking a PDF processing task, matched in a single pass
+PROCESSING_TASK_SUBJECT_RE = re.compile(r'processing|pdf|dibbs|evaluate')
+# Legacy "(ID: 123)" opportunity references in processing task descriptions
+OPPORTUNITY_ID_REF_RE = re.compile(r'\(ID:\s*(\d+)\)')
+
+# SQL fragments for the get_tasks due_date_range filter
+TASK_DUE_DATE_RANGE_FILTERS = {
+    'overdue': " AND t.due_date < date('now') AND t.status != 'Completed'",
+    'today': " AND t.due_date = date('now') AND t.status != 'Completed'",
+    'this_week': " AND t.due_date BETWEEN date('now') AND date('now', '+7 days') AND t.status != 'Completed'",
+    'next_week': " AND t.due_date BETWEEN date('now', '+7 days') AND date('now', '+14 days') AND t.status != 'Completed'"
+}
 
 class CRMData:
     
@@ -407,8 +441,7 @@ class CRMData:
         valid_fields = {k: v for k, v in kwargs.items() if k in fields and v is not None}
         valid_fields['product_id'] = product_id
         valid_fields['vendor_id'] = vendor_id
-        valid_fields['created_date'] = datetime.now()
-        valid_fields['modified_date'] = datetime.now()
+        valid_fields['created_date'] = valid_fields['modified_date'] = datetime.now()
         
         placeholders = ', '.join(['?' for _ in valid_fields])
         columns = ', '.join(valid_fields.keys())
@@ -737,6 +770,7 @@ class CRMData:
                    a.name as account_name, 
                    (c.first_name || ' ' || c.last_name) as contact_name, 
                    p.name as product_name,
+                   p.nsn as product_nsn,
                    CASE 
                        WHEN o.close_date < date('now') AND o.stage NOT IN ('Closed Won', 'Closed Lost') THEN 'Overdue'
                        ELSE 'Active'
@@ -745,10 +779,11 @@ class CRMData:
             LEFT JOIN accounts a ON o.account_id = a.id
             LEFT JOIN contacts c ON o.contact_id = c.id
             LEFT JOIN products p ON o.product_id = p.id
-            WHERE date(o.created_date) = ?
+            WHERE o.created_date >= ? AND o.created_date < date(?, '+1 day')
             ORDER BY o.created_date DESC
         """
-        return db.execute_query(query, [date_str])
+        # Half-open range on the raw column so idx_opportunities_created is used
+        return db.execute_query(query, [date_str, date_str])
     
     def update_opportunity(self, opportunity_id, **kwargs):
         """Update an opportunity with automatic profit calculation"""
@@ -812,7 +847,7 @@ class CRMData:
         """Get opportunity statistics"""
         stats = {}
         
-        # Basic counts
+        # Counts and financial totals in a single pass over the table
         result = db.execute_query("""
             SELECT 
                 COUNT(*) as total,
@@ -821,16 +856,7 @@ class CRMData:
                 COUNT(CASE WHEN state = 'Bid Lost' THEN 1 END) as lost,
                 COUNT(CASE WHEN state = 'No Bid' THEN 1 END) as no_bid,
                 COUNT(CASE WHEN close_date < date('now') AND state NOT IN ('Won', 'Bid Lost') THEN 1 END) as overdue,
-                COUNT(CASE WHEN close_date = date('now') THEN 1 END) as due_today
-            FROM opportunities
-        """)
-        
-        if result:
-            stats.update(result[0])
-        
-        # Financial stats
-        financial = db.execute_query("""
-            SELECT 
+                COUNT(CASE WHEN close_date = date('now') THEN 1 END) as due_today,
                 SUM(CASE WHEN state = 'Active' THEN bid_price * quantity ELSE 0 END) as pipeline_value,
                 SUM(CASE WHEN state = 'Won' THEN bid_price * quantity ELSE 0 END) as won_value,
                 SUM(CASE WHEN state = 'Won' THEN profit ELSE 0 END) as total_profit,
@@ -838,8 +864,8 @@ class CRMData:
             FROM opportunities
         """)
         
-        if financial:
-            stats.update(financial[0])
+        if result:
+            stats.update(result[0])
         
         return stats
     
@@ -883,7 +909,7 @@ class CRMData:
                     ELSE 6
                 END
         """
-        return db.execute_query(query)
+        return db.execute_query(query, cached=True)
     
     def get_opportunities_by_state(self):
         """Get opportunity counts by state"""
@@ -896,28 +922,25 @@ class CRMData:
             GROUP BY state
             ORDER BY count DESC
         """
-        return db.execute_query(query)
+        return db.execute_query(query, cached=True)
     
     def advance_opportunity_stage(self, opportunity_id):
         """Advance opportunity to next stage"""
-        opportunity = self.get_opportunity_by_id(opportunity_id)
-        if not opportunity:
-            return False
-        
-        stage_progression = {
-            'Prospecting': 'RFQ Requested',
-            'RFQ Requested': 'RFQ Received', 
-            'RFQ Received': 'Submit Bid',
-            'Submit Bid': 'Project Started',
-            'Project Started': 'Project Started'  # Final stage
-        }
-        
-        current_stage = opportunity['stage']
-        next_stage = stage_progression.get(current_stage)
+        # A single UPDATE picks the next stage and RETURNING reports it, no read first
+        cases = ' '.join('WHEN ? THEN ?' for _ in STAGE_PROGRESSION)
+        placeholders = ', '.join('?' for _ in STAGE_PROGRESSION)
+        query = f"""
+            UPDATE opportunities
+            SET stage = CASE stage {cases} END, modified_date = ?
+            WHERE id = ? AND stage IN ({placeholders})
+            RETURNING stage
+        """
+        params = [value for stage_pair in STAGE_PROGRESSION.items() for value in stage_pair]
+        params += [datetime.now().isoformat(), opportunity_id, *STAGE_PROGRESSION]
         
-        if next_stage:
-            return self.update_opportunity(opportunity_id, stage=next_stage)
-        return False
+        with self.transaction():
+            result = db.execute_query(query, params)
+        return result[0]['stage'] if result else False
     
     def mark_opportunity_won(self, opportunity_id):
         """Mark opportunity as won"""
@@ -937,11 +960,11 @@ class CRMData:
             FROM opportunities o
             LEFT JOIN accounts a ON o.account_id = a.id
             LEFT JOIN contacts c ON o.contact_id = c.id
-            WHERE o.close_date BETWEEN date('now') AND date('now', '+{} days')
+            WHERE o.close_date BETWEEN date('now') AND date('now', ?)
             AND o.stage NOT IN ('Closed Won', 'Closed Lost')
             ORDER BY o.close_date ASC
-        """.format(days)
-        return db.execute_query(query)
+        """
+        return db.execute_query(query, [f'+{int(days)} days'])
     
     def get_overdue_opportunities(self):
         """Get overdue opportunities"""
@@ -959,7 +982,7 @@ class CRMData:
     def get_packaging_types(self):
         """Get distinct packaging types for dropdown"""
         query = "SELECT DISTINCT packaging_type FROM opportunities WHERE packaging_type IS NOT NULL ORDER BY packaging_type"
-        result = db.execute_query(query)
+        result = db.execute_query(query, cached=True)
         
         # Add default types if not in database
         default_types = ['MIL-STD-2073-1E', 'ASTM']
@@ -1146,12 +1169,9 @@ class CRMData:
             valid_fields['status'] = 'Not Started'
         if 'priority' not in valid_fields:
             valid_fields['priority'] = 'Medium'
-        if 'created_date' not in valid_fields:
-            from datetime import datetime
-            valid_fields['created_date'] = datetime.now().isoformat()
-        if 'modified_date' not in valid_fields:
-            from datetime import datetime
-            valid_fields['modified_date'] = datetime.now().isoformat()
+        now = datetime.now().isoformat()
+        valid_fields.setdefault('created_date', now)
+        valid_fields.setdefault('modified_date', now)
         
         placeholders = ', '.join(['?' for _ in valid_fields])
         columns = ', '.join(valid_fields.keys())
@@ -1190,7 +1210,8 @@ class CRMData:
     def complete_task(self, task_id):
         """Mark task as completed"""
         query = "UPDATE tasks SET status = 'Completed', completed_date = ?, modified_date = ? WHERE id = ?"
-        return db.execute_update(query, [datetime.now(), datetime.now(), task_id])
+        now = datetime.now()
+        return db.execute_update(query, [now, now, task_id])
     
     def get_opportunities_linked_to_task(self, task_id):
         """Get opportunities that are linked to a specific task"""
@@ -1200,11 +1221,13 @@ class CRMData:
             return []
 
         opportunities = []
+        seen_ids = set()  # O(1) de-duplication instead of comparing whole rows
         
         # If task is directly linked to an opportunity
         if task.get('parent_item_type') == 'Opportunity' and task.get('parent_item_id'):
             opp = self.get_opportunity_by_id(task['parent_item_id'])
             if opp:
+                seen_ids.add(opp['id'])
                 opportunities.append(opp)
         
         # For processing tasks, also look for opportunities that reference this task
@@ -1213,10 +1236,7 @@ class CRMData:
         
         # Check if this is a processing task by subject keywords or if it has processing data
         is_processing_task = (
-            'processing' in task_subject or 
-            'pdf' in task_subject or 
-            'dibbs' in task_subject or 
-            'evaluate' in task_subject or
+            PROCESSING_TASK_SUBJECT_RE.search(task_subject) is not None or
             '<!-- PROCESSING_DATA:' in task_description
         )
         
@@ -1232,7 +1252,8 @@ class CRMData:
             
             for result in ref_task_results:
                 opp = self.get_opportunity_by_id(result['parent_item_id'])
-                if opp and opp not in opportunities:
+                if opp and opp['id'] not in seen_ids:
+                    seen_ids.add(opp['id'])
                     opportunities.append(opp)
             
             # Also extract opportunity IDs from the task description if it lists created opportunities
@@ -1240,14 +1261,13 @@ class CRMData:
             
             # Check for old format with "(ID: 123)" patterns
             if 'Created Opportunities:' in description:
-                # Extract opportunity IDs from the description
-                import re
-                # Look for patterns like "(ID: 123)" in the description
-                id_matches = re.findall(r'\(ID:\s*(\d+)\)', description)
+                # Extract opportunity IDs from patterns like "(ID: 123)"
+                id_matches = OPPORTUNITY_ID_REF_RE.findall(description)
                 for opp_id in id_matches:
                     try:
                         opp = self.get_opportunity_by_id(int(opp_id))
-                        if opp and opp not in opportunities:
+                        if opp and opp['id'] not in seen_ids:
+                            seen_ids.add(opp['id'])
                             opportunities.append(opp)
                     except (ValueError, TypeError):
                         continue
@@ -1273,7 +1293,8 @@ class CRMData:
                                 if opp_id:
                                     try:
                                         opp = self.get_opportunity_by_id(int(opp_id))
-                                        if opp and opp not in opportunities:
+                                        if opp and opp['id'] not in seen_ids:
+                                            seen_ids.add(opp['id'])
                                             opportunities.append(opp)
                                     except (ValueError, TypeError):
                                         continue
@@ -1350,14 +1371,22 @@ class CRMData:
         
         return db.execute_query(query, params if params else None)
     
-    def execute_query(self, query, params=None):
+    def execute_query(self, query, params=None, cached=False):
         """Execute a custom query and return results"""
-        return db.execute_query(query, params)
+        return db.execute_query(query, params, cached=cached)
     
     def execute_update(self, query, params=None):
         """Execute a custom update/insert query"""
         return db.execute_update(query, params)
     
+    def execute_many(self, query, params_seq):
+        """Execute a custom update/insert query for many parameter sets"""
+        return db.execute_many(query, params_seq)
+    
+    def transaction(self):
+        """Context manager that commits the enclosed writes together"""
+        return db.transaction()
+    
     def get_interactions(self, filters=None, limit=None):
         """Get interactions with optional filters"""
         query = """
@@ -1486,8 +1515,7 @@ class CRMData:
         
         # Set default values
         valid_fields['is_active'] = valid_fields.get('is_active', True)
-        valid_fields['created_date'] = datetime.now()
-        valid_fields['modified_date'] = datetime.now()
+        valid_fields['created_date'] = valid_fields['modified_date'] = datetime.now()
         
         placeholders = ', '.join(['?' for _ in valid_fields])
         columns = ', '.join(valid_fields.keys())
@@ -1609,6 +1637,7 @@ class CRMData:
         if not note or not note.strip():
             raise ValueError("Note content is required")
         
+        now = datetime.now()
         valid_fields = {
             'note': note.strip(),
             'account_id': kwargs.get('account_id'),
@@ -1616,8 +1645,8 @@ class CRMData:
             'opportunity_id': kwargs.get('opportunity_id'),
             'project_id': kwargs.get('project_id'),
             'created_by': kwargs.get('created_by'),
-            'created_date': datetime.now(),
-            'last_modified': datetime.now()
+            'created_date': now,
+            'last_modified': now
         }
         
         # Remove None values
@@ -1922,14 +1951,7 @@ class CRMData:
                 base_query += " AND t.assigned_to LIKE ?"
                 params.append(f"%{filters['owner']}%")
             if filters.get('due_date_range'):
-                if filters['due_date_range'] == 'overdue':
-                    base_query += " AND t.due_date < date('now') AND t.status != 'Completed'"
-                elif filters['due_date_range'] == 'today':
-                    base_query += " AND t.due_date = date('now') AND t.status != 'Completed'"
-                elif filters['due_date_range'] == 'this_week':
-                    base_query += " AND t.due_date BETWEEN date('now') AND date('now', '+7 days') AND t.status != 'Completed'"
-                elif filters['due_date_range'] == 'next_week':
-                    base_query += " AND t.due_date BETWEEN date('now', '+7 days') AND date('now', '+14 days') AND t.status != 'Completed'"
+                base_query += TASK_DUE_DATE_RANGE_FILTERS.get(filters['due_date_range'], '')
             if filters.get('parent_item_type'):
                 base_query += " AND t.parent_item_type = ?"
                 params.append(filters['parent_item_type'])
@@ -2101,18 +2123,9 @@ class CRMData:
         # Calculate default duration if not stored
         if not interaction.get('duration_minutes'):
             interaction_type = interaction.get('type', '').lower()
-            default_durations = {
-                'call': 15,
-                'phone': 15,
-                'meeting': 60,
-                'email': 5,
-                'demo': 90,
-                'presentation': 60,
-                'follow-up': 10
-            }
             
             # Find matching type
-            for type_key, duration in default_durations.items():
+            for type_key, duration in DEFAULT_INTERACTION_DURATIONS:
                 if type_key in interaction_type:
                     interaction['duration_minutes'] = duration
                     break
@@ -2195,18 +2208,20 @@ class CRMData:
         if not valid_fields:
             raise ValueError("No valid fields to update")
         
+        now = datetime.now()
+        
         # Auto-set completed_date if status changed to Completed
         if valid_fields.get('status') == 'Completed' and 'completed_date' not in valid_fields:
-            valid_fields['completed_date'] = datetime.now().date().isoformat()
+            valid_fields['completed_date'] = now.date().isoformat()
         
         # Auto-set start_date if status changed to In Progress and no start_date
         if valid_fields.get('status') == 'In Progress':
             current_task = self.get_task_by_id(task_id)
             if current_task and not current_task.get('start_date') and 'start_date' not in valid_fields:
-                valid_fields['start_date'] = datetime.now().date().isoformat()
+                valid_fields['start_date'] = now.date().isoformat()
         
         # Always update modified_date
-        valid_fields['modified_date'] = datetime.now().isoformat()
+        valid_fields['modified_date'] = now.isoformat()
         
         set_clause = ', '.join([f"{k} = ?" for k in valid_fields.keys()])
         query = f"UPDATE tasks SET {set_clause} WHERE id = ?"
@@ -2428,7 +2443,7 @@ class CRMData:
         """Get project statistics"""
         stats = {}
         
-        # Basic counts
+        # Basic counts and financial stats in a single pass over projects
         result = db.execute_query("""
             SELECT 
                 COUNT(*) as total,
@@ -2437,16 +2452,7 @@ class CRMData:
                 COUNT(CASE WHEN status = 'Done' THEN 1 END) as completed,
                 COUNT(CASE WHEN priority = 'High' THEN 1 END) as high_priority,
                 COUNT(CASE WHEN due_date < date('now') AND status != 'Done' THEN 1 END) as overdue,
-                COUNT(CASE WHEN due_date = date('now') THEN 1 END) as due_today
-            FROM projects
-        """)
-        
-        if result:
-            stats.update(result[0])
-        
-        # Financial stats
-        financial = db.execute_query("""
-            SELECT 
+                COUNT(CASE WHEN due_date = date('now') THEN 1 END) as due_today,
                 SUM(budget) as total_budget,
                 SUM(actual_cost) as total_actual_cost,
                 AVG(progress_percentage) as avg_progress,
@@ -2455,8 +2461,8 @@ class CRMData:
             FROM projects
         """)
         
-        if financial:
-            stats.update(financial[0])
+        if result:
+            stats.update(result[0])
         
         return stats
     
@@ -2734,6 +2740,31 @@ class CRMData:
         """
         return db.execute_query(query, [product_id])
     
+    def get_qpl_manufacturers_for_products(self, product_ids):
+        """Get QPL manufacturers for several products, keyed by product ID"""
+        manufacturers = {product_id: [] for product_id in product_ids}
+        if not manufacturers:
+            return manufacturers
+        
+        placeholders = ', '.join(['?' for _ in manufacturers])
+        query = f"""
+            SELECT DISTINCT 
+                q.product_id,
+                a.id as account_id,
+                a.name as manufacturer_name,
+                a.cage as cage_code,
+                q.part_number,
+                q.created_date,
+                q.id
+            FROM qpls q 
+            JOIN accounts a ON q.account_id = a.id 
+            WHERE q.product_id IN ({placeholders})
+            ORDER BY a.name
+        """
+        for row in db.execute_query(query, list(manufacturers)):
+            manufacturers[row['product_id']].append(row)
+        return manufacturers
+    
     def get_qpl_products_for_manufacturer(self, account_id):
         """Get all QPL products for a specific manufacturer/account"""
         query = """
@@ -2768,27 +2799,26 @@ class CRMData:
     
     def get_qpl_summary_stats(self):
         """Get QPL summary statistics"""
-        stats = {}
-        
-        # Total QPL entries
-        result = db.execute_query("SELECT COUNT(*) as count FROM qpls WHERE is_active = 1")
-        stats['total_qpl_entries'] = result[0]['count'] if result else 0
-        
-        # Total QPL manufacturers
-        result = db.execute_query("SELECT COUNT(DISTINCT account_id) as count FROM qpls WHERE is_active = 1")
-        stats['total_manufacturers'] = result[0]['count'] if result else 0
-        
-        # Total products with QPL
-        result = db.execute_query("SELECT COUNT(DISTINCT product_id) as count FROM qpls WHERE is_active = 1")
-        stats['total_products_with_qpl'] = result[0]['count'] if result else 0
-        
-        # Products without QPL
+        # All four counts in a single round trip
         result = db.execute_query("""
-            SELECT COUNT(*) as count FROM products p 
-            WHERE p.id NOT IN (SELECT DISTINCT product_id FROM qpls WHERE is_active = 1)
-            AND p.is_active = 1
+            SELECT COUNT(*) as total_qpl_entries,
+                   COUNT(DISTINCT account_id) as total_manufacturers,
+                   COUNT(DISTINCT product_id) as total_products_with_qpl,
+                   (SELECT COUNT(*) FROM products p 
+                    WHERE p.id NOT IN (SELECT DISTINCT product_id FROM qpls WHERE is_active = 1)
+                    AND p.is_active = 1) as products_without_qpl
+            FROM qpls
+            WHERE is_active = 1
         """)
-        stats['products_without_qpl'] = result[0]['count'] if result else 0
+        
+        stats = {
+            'total_qpl_entries': 0,
+            'total_manufacturers': 0,
+            'total_products_with_qpl': 0,
+            'products_without_qpl': 0
+        }
+        if result:
+            stats.update(result[0])
         
         return stats
     
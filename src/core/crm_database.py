@@ -8,10 +8,20 @@ from pathlib import Path
 # Local CRM Database Schema
 # Self-contained CRM system for DIBBs processing
 
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+from .db_connection import open_connection
+
+# Opted-in read query results are reused while no connection has written to
+# the database or changed its schema
+QUERY_CACHE_MAXSIZE = 500
+CLOCK_DEPENDENT_SQL_RE = re.compile(r"'now'|\bcurrent_(?:date|time|timestamp)\b", re.IGNORECASE)
+
 class CRMDatabase:
     def __init__(self, db_path=None):
         # Use config manager for database path if available, else default
@@ -25,13 +35,28 @@ class CRMDatabase:
                 self.db_path = base_dir / 'crm_database.db'
         else:
             self.db_path = Path(db_path)
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn = open_connection(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Enable dict-like access
+        # Schema introspection results, valid while PRAGMA schema_version is unchanged
+        self._schema_cache = {}
+        self._schema_version = None
+        # Opted-in SELECT results, valid while data_version, schema_version and total_changes are unchanged
+        self._query_cache = {}
+        self._data_version = None
+        # Nesting depth of transaction() blocks; writes commit only at depth 0
+        self._transaction_depth = 0
+        # The connection is shared across request threads: a transaction holds this
+        # for its whole body so other threads' writes can't commit or roll back its work
+        self._lock = threading.RLock()
         self.create_tables()
     
     def create_tables(self):
         """Create all CRM tables based on Notion structure"""
         
+        # sqlite3 autocommits each DDL statement; run the whole schema pass as
+        # one transaction so startup pays a single commit
+        self.conn.execute('BEGIN')
+        
         # Accounts Table
         self.conn.execute('''
             CREATE TABLE IF NOT EXISTS accounts (
@@ -256,13 +281,24 @@ class CRMDatabase:
         
         # Create indexes for better performance
         indexes = [
+            'CREATE INDEX IF NOT EXISTS idx_accounts_created ON accounts(created_date)',
+            'CREATE INDEX IF NOT EXISTS idx_accounts_cage ON accounts(cage)',
             'CREATE INDEX IF NOT EXISTS idx_contacts_account ON contacts(account_id)',
+            'CREATE INDEX IF NOT EXISTS idx_contacts_created ON contacts(created_date)',
             'CREATE INDEX IF NOT EXISTS idx_opportunities_account ON opportunities(account_id)',
             'CREATE INDEX IF NOT EXISTS idx_opportunities_contact ON opportunities(contact_id)',
+            'CREATE INDEX IF NOT EXISTS idx_opportunities_created ON opportunities(created_date)',
+            'CREATE INDEX IF NOT EXISTS idx_opportunities_name ON opportunities(name)',
+            'CREATE INDEX IF NOT EXISTS idx_opportunities_stage ON opportunities(stage)',
+            'CREATE INDEX IF NOT EXISTS idx_products_nsn ON products(nsn, name)',
+            'CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_date)',
             'CREATE INDEX IF NOT EXISTS idx_rfqs_product ON rfqs(product_id)',
             'CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)',
             'CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)',
             'CREATE INDEX IF NOT EXISTS idx_interactions_date ON interactions(interaction_date)',
+            'CREATE INDEX IF NOT EXISTS idx_interactions_opportunity ON interactions(opportunity_id)',
+            'CREATE INDEX IF NOT EXISTS idx_interactions_account ON interactions(account_id)',
+            'CREATE INDEX IF NOT EXISTS idx_interactions_contact ON interactions(contact_id)',
             'CREATE INDEX IF NOT EXISTS idx_qpls_product ON qpls(product_id)',
             'CREATE INDEX IF NOT EXISTS idx_qpls_account ON qpls(account_id)',
             'CREATE INDEX IF NOT EXISTS idx_qpls_manufacturer ON qpls(manufacturer_name)',
@@ -280,25 +316,107 @@ class CRMDatabase:
         """Close database connection"""
         self.conn.close()
     
-    def execute_query(self, query, params=None):
+    @staticmethod
+    def _is_schema_query(query):
+        """Check whether a query only reads schema metadata"""
+        normalized = query.lstrip().lower()
+        return normalized.startswith('pragma table_info') or (
+            normalized.startswith('select') and 'sqlite_master' in normalized
+        )
+    
+    def _execute_schema_query(self, query, params=None):
+        """Serve schema introspection from cache until the schema changes"""
+        version = self.conn.execute('PRAGMA schema_version').fetchone()[0]
+        if version != self._schema_version:
+            self._schema_cache.clear()
+            self._schema_version = version
+        
+        key = (query, tuple(params) if params else ())
+        if key not in self._schema_cache:
+            cursor = self.conn.execute(query, params) if params else self.conn.execute(query)
+            self._schema_cache[key] = [dict(row) for row in cursor]
+        return [dict(row) for row in self._schema_cache[key]]
+    
+    def _execute_cached_query(self, query, params=None):
+        """Serve a SELECT from cache until any connection writes or changes the schema"""
+        with self._lock:
+            # data_version moves on commits from other connections, schema_version on
+            # DDL from any connection, total_changes on our own writes
+            row = self.conn.execute(
+                'SELECT data_version, schema_version FROM pragma_data_version, pragma_schema_version'
+            ).fetchone()
+            version = (row[0], row[1], self.conn.total_changes)
+            if version != self._data_version:
+                self._query_cache.clear()
+                self._data_version = version
+            
+            key = (query, tuple(params) if params else ())
+            cached = self._query_cache.get(key)
+            if cached is None:
+                if len(self._query_cache) >= QUERY_CACHE_MAXSIZE:
+                    self._query_cache.clear()
+                cursor = self.conn.execute(query, params) if params else self.conn.execute(query)
+                cached = [dict(row) for row in cursor]
+                self._query_cache[key] = cached
+        return [dict(row) for row in cached]
+    
+    def execute_query(self, query, params=None, cached=False):
         """Execute a query and return results as dictionaries"""
+        if self._is_schema_query(query):
+            return self._execute_schema_query(query, params)
+        
+        # Only callers that know the query is time-independent opt in; anything
+        # reading the clock is never cached
+        if (cached and not isinstance(params, dict)
+                and query.lstrip()[:6].lower() == 'select'
+                and not CLOCK_DEPENDENT_SQL_RE.search(query)):
+            return self._execute_cached_query(query, params)
+        
         if params:
             cursor = self.conn.execute(query, params)
         else:
             cursor = self.conn.execute(query)
         
-        # Convert sqlite3.Row objects to dictionaries
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        # Convert sqlite3.Row objects to dictionaries straight off the cursor
+        return [dict(row) for row in cursor]
     
     def execute_update(self, query, params=None):
         """Execute an update/insert query"""
-        if params:
-            cursor = self.conn.execute(query, params)
-        else:
-            cursor = self.conn.execute(query)
-        self.conn.commit()
+        with self._lock:
+            if params:
+                cursor = self.conn.execute(query, params)
+            else:
+                cursor = self.conn.execute(query)
+            if not self._transaction_depth:
+                self.conn.commit()
         return cursor.lastrowid if cursor.lastrowid else cursor.rowcount
+    
+    def execute_many(self, query, params_seq):
+        """Execute an update/insert query once per parameter set in a single transaction"""
+        with self._lock:
+            cursor = self.conn.executemany(query, params_seq)
+            if not self._transaction_depth:
+                self.conn.commit()
+        return cursor.rowcount
+    
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one commit, rolling all of them back on error"""
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.conn.rollback()
+                    # Rolled-back rows may already be cached under the current total_changes
+                    self._query_cache.clear()
+                    self._data_version = None
+                raise
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self.conn.commit()
 
 # Database instance
 db = CRMDatabase()
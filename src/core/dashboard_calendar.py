@@ -272,44 +272,48 @@ class DashboardCalendar:
         tasks = crm_data.get_tasks()
         task_stats = {
             'total': len(tasks),
-            'completed': len([t for t in tasks if t.get('status', '').lower() == 'completed']),
+            'completed': 0,
             'overdue': 0,
             'due_today': 0,
             'due_this_week': 0
         }
         
+        # Single pass over the tasks for both the completed and due-date counts
+        today = now.date()
+        week_end_date = (now + timedelta(days=7)).date()
         for task in tasks:
+            is_completed = task.get('status', '').lower() == 'completed'
+            if is_completed:
+                task_stats['completed'] += 1
             if task.get('due_date'):
                 try:
                     due_date = datetime.fromisoformat(task['due_date'].replace('Z', '+00:00'))
-                    if due_date.date() == now.date():
+                    if due_date.date() == today:
                         task_stats['due_today'] += 1
-                    elif due_date.date() <= (now + timedelta(days=7)).date():
+                    elif due_date.date() <= week_end_date:
                         task_stats['due_this_week'] += 1
-                    if due_date < now and task.get('status', '').lower() != 'completed':
+                    if due_date < now and not is_completed:
                         task_stats['overdue'] += 1
                 except (ValueError, TypeError):
                     continue
         
-        # Get opportunities
-        opportunities = crm_data.get_opportunities()
-        opp_stats = {
-            'total': len(opportunities),
+        # Opportunity counts come from one aggregate query rather than loading
+        # every opportunity (with its joined names) just to bucket close dates
+        week_end = week_end_date.isoformat()
+        month_end = (now + timedelta(days=30)).date().isoformat()
+        result = crm_data.execute_query("""
+            SELECT
+                COUNT(*) as total,
+                COUNT(CASE WHEN date(close_date) <= ? THEN 1 END) as closing_this_week,
+                COUNT(CASE WHEN date(close_date) <= ? THEN 1 END) as closing_this_month
+            FROM opportunities
+        """, [week_end, month_end])
+        opp_stats = dict(result[0]) if result else {
+            'total': 0,
             'closing_this_week': 0,
             'closing_this_month': 0
         }
         
-        for opp in opportunities:
-            if opp.get('close_date'):
-                try:
-                    close_date = datetime.fromisoformat(opp['close_date'].replace('Z', '+00:00'))
-                    if close_date.date() <= (now + timedelta(days=7)).date():
-                        opp_stats['closing_this_week'] += 1
-                    if close_date.date() <= (now + timedelta(days=30)).date():
-                        opp_stats['closing_this_month'] += 1
-                except (ValueError, TypeError):
-                    continue
-        
         return {
             'tasks': task_stats,
             'opportunities': opp_stats,
@@ -0,0 +1,33 @@
+"""
+Database Connection Setup
+=========================
+
+Opens SQLite connections to the CRM database with the standard PRAGMAs.
+Importing this module has no side effects, unlike crm_database, which
+creates the shared CRMDatabase instance on import.
+"""
+
+import sqlite3
+
+# Connection tuning applied to every CRM database connection: WAL lets the
+# web app keep reading while email automation writes, and the larger page
+# cache / mmap window keep hot tables out of read() syscalls
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Prepared statements kept per connection; the shared connection serves every
+# page's queries, which is more distinct SQL than sqlite3's default of 128
+CACHED_STATEMENTS = 256
+
+def open_connection(db_path, **kwargs):
+    """Open a SQLite connection to the CRM database with standard PRAGMAs applied"""
+    kwargs.setdefault('cached_statements', CACHED_STATEMENTS)
+    conn = sqlite3.connect(str(db_path), **kwargs)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
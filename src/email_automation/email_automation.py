@@ -3,12 +3,87 @@ Email Automation System for Vendor Quote Requests
 Generates professional RFQ emails with templates
 """
 
+import functools
 import sqlite3
+import threading
 from datetime import datetime, timedelta
 import re
+import secrets
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from ..core.db_connection import open_connection
+
+# Opportunities whose vendor email lists are kept before the cache is reset
+VENDOR_EMAILS_CACHE_MAXSIZE = 500
+
+# {name} placeholders in email templates
+TEMPLATE_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+# Email automation schema, run as one executescript call in _setup_database
+EMAIL_SCHEMA_SQL = """
+-- Vendor RFQ emails
+CREATE TABLE IF NOT EXISTS vendor_rfq_emails (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    opportunity_id INTEGER,
+    vendor_account_id INTEGER,
+    vendor_contact_id INTEGER,
+    rfq_email_id TEXT UNIQUE,
+    subject TEXT,
+    email_body TEXT,
+    status TEXT DEFAULT 'Draft',
+    created_date TEXT,
+    sent_date TEXT,
+    response_received_date TEXT,
+    response_data TEXT,
+    FOREIGN KEY (opportunity_id) REFERENCES opportunities (id),
+    FOREIGN KEY (vendor_account_id) REFERENCES accounts (id),
+    FOREIGN KEY (vendor_contact_id) REFERENCES contacts (id)
+);
+
+-- Email templates
+CREATE TABLE IF NOT EXISTS email_templates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE,
+    type TEXT,
+    subject_template TEXT,
+    body_template TEXT,
+    variables TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_date TEXT,
+    modified_date TEXT
+);
+
+-- Quotes (enhanced from RFQs)
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rfq_email_id TEXT,
+    vendor_account_id INTEGER,
+    quote_number TEXT,
+    quote_amount DECIMAL(10,2),
+    lead_time TEXT,
+    delivery_terms TEXT,
+    validity_period TEXT,
+    notes TEXT,
+    status TEXT DEFAULT 'Pending',
+    quote_date TEXT,
+    response_date TEXT,
+    FOREIGN KEY (rfq_email_id) REFERENCES vendor_rfq_emails (id),
+    FOREIGN KEY (vendor_account_id) REFERENCES accounts (id)
+);
+
+-- Indexes for the email status polling queries
+CREATE INDEX IF NOT EXISTS idx_vendor_rfq_emails_status_sent ON vendor_rfq_emails(status, sent_date);
+CREATE INDEX IF NOT EXISTS idx_vendor_rfq_emails_response ON vendor_rfq_emails(response_received_date);
+-- Per-opportunity email history, already in display order
+CREATE INDEX IF NOT EXISTS idx_vendor_rfq_emails_opportunity ON vendor_rfq_emails(opportunity_id, created_date);
+"""
+
+@functools.lru_cache(maxsize=64)
+def _split_template(template: str) -> tuple:
+    """Split a template once into literal text at even and placeholder names at odd positions"""
+    return tuple(TEMPLATE_PLACEHOLDER_RE.split(template))
+
 class EmailAutomation:
     def __init__(self, db_path=None):
         # Default to data directory database path
@@ -17,76 +92,45 @@ class EmailAutomation:
             self.db_path = str(base_dir / 'data' / 'crm.db')
         else:
             self.db_path = db_path
-        self._ensure_email_tables()
-        self._add_default_templates()
+        self._conn = None  # Opened on first use and shared by every method
+        # Public methods hold this through their commit or rollback; request threads share the connection
+        self._lock = threading.RLock()
+        # Vendor emails per opportunity, valid while PRAGMA data_version and total_changes are unchanged
+        self._vendor_emails_cache = {}
+        self._data_version = None
+        self._setup_database()
     
-    def _ensure_email_tables(self):
-        """Ensure email automation tables exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create vendor_rfq_emails table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vendor_rfq_emails (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                opportunity_id INTEGER,
-                vendor_account_id INTEGER,
-                vendor_contact_id INTEGER,
-                rfq_email_id TEXT UNIQUE,
-                subject TEXT,
-                email_body TEXT,
-                status TEXT DEFAULT 'Draft',
-                created_date TEXT,
-                sent_date TEXT,
-                response_received_date TEXT,
-                response_data TEXT,
-                FOREIGN KEY (opportunity_id) REFERENCES opportunities (id),
-                FOREIGN KEY (vendor_account_id) REFERENCES accounts (id),
-                FOREIGN KEY (vendor_contact_id) REFERENCES contacts (id)
-            )
-        """)
-        
-        # Create email_templates table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS email_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                type TEXT,
-                subject_template TEXT,
-                body_template TEXT,
-                variables TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_date TEXT,
-                modified_date TEXT
-            )
-        """)
-        
-        # Create quotes table (enhanced from RFQs)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS quotes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                rfq_email_id TEXT,
-                vendor_account_id INTEGER,
-                quote_number TEXT,
-                quote_amount DECIMAL(10,2),
-                lead_time TEXT,
-                delivery_terms TEXT,
-                validity_period TEXT,
-                notes TEXT,
-                status TEXT DEFAULT 'Pending',
-                quote_date TEXT,
-                response_date TEXT,
-                FOREIGN KEY (rfq_email_id) REFERENCES vendor_rfq_emails (id),
-                FOREIGN KEY (vendor_account_id) REFERENCES accounts (id)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+    def _connect(self) -> sqlite3.Connection:
+        """Return the shared connection, opening it on first use"""
+        if self._conn is None:
+            self._conn = open_connection(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+    
+    def close(self):
+        """Close the shared connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _setup_database(self):
+        """Create the email tables and default templates in a single transaction"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                # executescript commits anything pending before it runs, so the BEGIN goes
+                # inside the script and stays open for the template inserts below
+                conn.executescript("BEGIN;\n" + EMAIL_SCHEMA_SQL)
+                self._add_default_templates()
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
     
     def _add_default_templates(self):
         """Add default email templates"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         templates = [
@@ -160,32 +204,41 @@ Reference ID: {rfq_email_id}""",
             }
         ]
         
-        for template in templates:
-            cursor.execute("""
-                INSERT OR REPLACE INTO email_templates 
-                (name, type, subject_template, body_template, variables, created_date, modified_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                template['name'],
-                template['type'],
-                template['subject_template'],
-                template['body_template'],
-                template['variables'],
-                datetime.now().isoformat(),
-                datetime.now().isoformat()
-            ))
-        
-        conn.commit()
-        conn.close()
+        # One multi-row INSERT: a single statement runs over every template
+        now = datetime.now().isoformat()
+        values = ', '.join(['(?, ?, ?, ?, ?, ?, ?)'] * len(templates))
+        params = [value for template in templates for value in (
+            template['name'],
+            template['type'],
+            template['subject_template'],
+            template['body_template'],
+            template['variables'],
+            now,
+            now
+        )]
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO email_templates 
+            (name, type, subject_template, body_template, variables, created_date, modified_date)
+            VALUES {values}
+        """, params)
     
     def generate_rfq_email(self, opportunity_id: int, vendor_account_id: int, 
                           vendor_contact_id: Optional[int] = None, template_name: str = 'Standard RFQ Request') -> Dict:
         """Generate RFQ email for a specific vendor"""
-        
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            opportunity, template = self._get_rfq_sources(cursor, opportunity_id, template_name)
+            email = self._create_rfq_email(cursor, opportunity_id, opportunity, template, template_name,
+                                           vendor_account_id, vendor_contact_id)
+            
+            conn.commit()
+            
+            return email
+    
+    def _get_rfq_sources(self, cursor, opportunity_id: int, template_name: str):
+        """Fetch the opportunity and active template an RFQ email is built from"""
         # Get opportunity details
         cursor.execute("""
             SELECT o.*, p.name as product_name, p.manufacturer, p.part_number, 
@@ -198,8 +251,16 @@ Reference ID: {rfq_email_id}""",
         """, (opportunity_id,))
         opportunity = cursor.fetchone()
         
+        # Get email template
+        cursor.execute("SELECT * FROM email_templates WHERE name = ? AND is_active = 1", (template_name,))
+        template = cursor.fetchone()
+        
+        return opportunity, template
+    
+    def _create_rfq_email(self, cursor, opportunity_id: int, opportunity, template, template_name: str,
+                          vendor_account_id: int, vendor_contact_id: Optional[int]) -> Dict:
+        """Build one vendor's RFQ email and insert it; the caller commits"""
         if not opportunity:
-            conn.close()
             raise ValueError(f"Opportunity {opportunity_id} not found")
         
         # Get vendor account details
@@ -207,7 +268,6 @@ Reference ID: {rfq_email_id}""",
         vendor_account = cursor.fetchone()
         
         if not vendor_account:
-            conn.close()
             raise ValueError(f"Vendor account {vendor_account_id} not found")
         
         # Get vendor contact details
@@ -225,16 +285,13 @@ Reference ID: {rfq_email_id}""",
             """, (vendor_account_id,))
             vendor_contact = cursor.fetchone()
         
-        # Get email template
-        cursor.execute("SELECT * FROM email_templates WHERE name = ? AND is_active = 1", (template_name,))
-        template = cursor.fetchone()
-        
         if not template:
-            conn.close()
             raise ValueError(f"Template '{template_name}' not found")
         
-        # Generate unique RFQ email ID
-        rfq_email_id = f"RFQ-{opportunity_id}-{vendor_account_id}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        now = datetime.now()
+        
+        # Generate unique RFQ email ID; the random suffix keeps repeat sends within a second distinct
+        rfq_email_id = f"RFQ-{opportunity_id}-{vendor_account_id}-{now.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
         
         # Prepare template variables
         # Extract manufacturer and part number from mfr field if available
@@ -263,7 +320,7 @@ Reference ID: {rfq_email_id}""",
             pass
         
         variables = {
-            'request_number': f"RFQ-{opportunity['id']}-{datetime.now().strftime('%Y%m%d')}",
+            'request_number': f"RFQ-{opportunity['id']}-{now.strftime('%Y%m%d')}",
             'product_name': opportunity['product_name'] if opportunity['product_name'] else 'Product Name Not Available',
             'manufacturer': manufacturer,
             'part_number': part_number,
@@ -274,7 +331,7 @@ Reference ID: {rfq_email_id}""",
             'required_delivery_date': opportunity['close_date'] if opportunity['close_date'] else 'TBD',
             'fob_terms': opportunity['fob'] if opportunity['fob'] else 'DESTINATION',
             'iso_required': opportunity['iso'] if opportunity['iso'] else 'YES',
-            'quote_deadline': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d'),
+            'quote_deadline': (now + timedelta(days=7)).strftime('%Y-%m-%d'),
             'buyer_name': opportunity['buyer'] if opportunity['buyer'] else 'THE BUYER',
             'buyer_email': 'buyer@company.com',
             'buyer_phone': '(555) 123-4567',
@@ -296,14 +353,11 @@ Reference ID: {rfq_email_id}""",
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             opportunity_id, vendor_account_id, vendor_contact_id, rfq_email_id,
-            subject, body, 'Draft', datetime.now().isoformat()
+            subject, body, 'Draft', now.isoformat()
         ))
         
         email_id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
-        
         return {
             'id': email_id,
             'rfq_email_id': rfq_email_id,
@@ -313,184 +367,204 @@ Reference ID: {rfq_email_id}""",
             'vendor_email': vendor_contact['email'] if vendor_contact else None,
             'vendor_contact_name': variables['vendor_contact_name'],
             'status': 'Draft',
-            'created_date': datetime.now().isoformat()
+            'created_date': now.isoformat()
         }
     
     def _replace_template_variables(self, template: str, variables: Dict) -> str:
         """Replace template variables with actual values"""
-        result = template
-        for key, value in variables.items():
-            placeholder = f"{{{key}}}"
-            result = result.replace(placeholder, str(value))
-        return result
+        parts = list(_split_template(template))
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            # Placeholders without a value are left in the text as-is
+            parts[i] = str(variables[name]) if name in variables else f"{{{name}}}"
+        return ''.join(parts)
     
     def generate_bulk_rfq_emails(self, opportunity_id: int, vendor_list: List[Dict], 
                                 template_name: str = 'Standard RFQ Request') -> List[Dict]:
         """Generate RFQ emails for multiple vendors"""
-        emails = []
-        
-        for vendor in vendor_list:
-            vendor_account_id = vendor['account_id']
-            vendor_contact_id = vendor.get('contact_id')
+        with self._lock:
+            emails = []
             
+            # The opportunity and template are looked up once and every email commits together
+            conn = self._connect()
+            cursor = conn.cursor()
             try:
-                email = self.generate_rfq_email(
-                    opportunity_id, vendor_account_id, vendor_contact_id, template_name
-                )
-                emails.append(email)
-            except Exception as e:
-                print(f"Error generating email for vendor {vendor_account_id}: {e}")
-                emails.append({
-                    'vendor_account_id': vendor_account_id,
-                    'error': str(e),
-                    'status': 'Error'
-                })
-        
-        return emails
+                opportunity, template = self._get_rfq_sources(cursor, opportunity_id, template_name)
+                
+                for vendor in vendor_list:
+                    vendor_account_id = None
+                    
+                    try:
+                        vendor_account_id = vendor['account_id']
+                        vendor_contact_id = vendor.get('contact_id')
+                        email = self._create_rfq_email(
+                            cursor, opportunity_id, opportunity, template, template_name,
+                            vendor_account_id, vendor_contact_id
+                        )
+                        emails.append(email)
+                    except Exception as e:
+                        print(f"Error generating email for vendor {vendor_account_id}: {e}")
+                        emails.append({
+                            'vendor_account_id': vendor_account_id,
+                            'error': str(e),
+                            'status': 'Error'
+                        })
+            except BaseException:
+                # Don't leave a half-written batch open on the shared connection
+                conn.rollback()
+                raise
+            
+            conn.commit()
+            
+            return emails
     
     def get_vendor_emails_for_opportunity(self, opportunity_id: int) -> List[Dict]:
-        """Get all vendor emails for an opportunity"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT ve.*, a.name as vendor_name, c.first_name, c.last_name, c.email
-            FROM vendor_rfq_emails ve
-            LEFT JOIN accounts a ON ve.vendor_account_id = a.id
-            LEFT JOIN contacts c ON ve.vendor_contact_id = c.id
-            WHERE ve.opportunity_id = ?
-            ORDER BY ve.created_date DESC
-        """, (opportunity_id,))
-        
-        emails = []
-        for row in cursor.fetchall():
-            emails.append(dict(row))
-        
-        conn.close()
-        return emails
+        """Get all vendor emails for an opportunity, cached until any connection writes"""
+        with self._lock:
+            conn = self._connect()
+            
+            # data_version moves on commits from other connections, total_changes on our own
+            version = (conn.execute('PRAGMA data_version').fetchone()[0], conn.total_changes)
+            if version != self._data_version or len(self._vendor_emails_cache) >= VENDOR_EMAILS_CACHE_MAXSIZE:
+                self._vendor_emails_cache.clear()
+                self._data_version = version
+            
+            cached = self._vendor_emails_cache.get(opportunity_id)
+            if cached is not None:
+                return [dict(email) for email in cached]
+            
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ve.*, a.name as vendor_name, c.first_name, c.last_name, c.email
+                FROM vendor_rfq_emails ve
+                LEFT JOIN accounts a ON ve.vendor_account_id = a.id
+                LEFT JOIN contacts c ON ve.vendor_contact_id = c.id
+                WHERE ve.opportunity_id = ?
+                ORDER BY ve.created_date DESC
+            """, (opportunity_id,))
+            
+            emails = [dict(row) for row in cursor]
+            self._vendor_emails_cache[opportunity_id] = emails
+            
+            return [dict(email) for email in emails]
     
     def update_email_status(self, email_id: int, status: str, response_data: str = None) -> bool:
         """Update email status and response data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        update_fields = ['status = ?']
-        values = [status]
-        
-        if status == 'Sent':
-            update_fields.append('sent_date = ?')
-            values.append(datetime.now().isoformat())
-        elif status == 'Responded':
-            update_fields.append('response_received_date = ?')
-            values.append(datetime.now().isoformat())
-            if response_data:
-                update_fields.append('response_data = ?')
-                values.append(response_data)
-        
-        values.append(email_id)
-        
-        cursor.execute(f"""
-            UPDATE vendor_rfq_emails 
-            SET {', '.join(update_fields)}
-            WHERE id = ?
-        """, values)
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            update_fields = ['status = ?']
+            values = [status]
+            
+            if status == 'Sent':
+                update_fields.append('sent_date = ?')
+                values.append(datetime.now().isoformat())
+            elif status == 'Responded':
+                update_fields.append('response_received_date = ?')
+                values.append(datetime.now().isoformat())
+                if response_data:
+                    update_fields.append('response_data = ?')
+                    values.append(response_data)
+            
+            values.append(email_id)
+            
+            cursor.execute(f"""
+                UPDATE vendor_rfq_emails 
+                SET {', '.join(update_fields)}
+                WHERE id = ?
+            """, values)
+            
+            success = cursor.rowcount > 0
+            conn.commit()
+            
+            return success
     
     def get_email_templates(self) -> List[Dict]:
         """Get all available email templates"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM email_templates 
-            WHERE is_active = 1 
-            ORDER BY type, name
-        """)
-        
-        templates = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return templates
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT * FROM email_templates 
+                WHERE is_active = 1 
+                ORDER BY type, name
+            """)
+            
+            templates = [dict(row) for row in cursor]
+            return templates
     
     def preview_email(self, opportunity_id: int, vendor_account_id: int, 
                      template_name: str = 'Standard RFQ Request') -> Dict:
         """Preview email without saving to database"""
-        # This generates the email content but doesn't save it
-        # Useful for previewing before sending
-        
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get opportunity details (same as generate_rfq_email but without saving)
-        cursor.execute("""
-            SELECT o.*, p.name as product_name, p.manufacturer, p.part_number, 
-                   p.nsn, p.description as product_description
-            FROM opportunities o
-            LEFT JOIN products p ON o.product_id = p.id
-            WHERE o.id = ?
-        """, (opportunity_id,))
-        opportunity = cursor.fetchone()
-        
-        cursor.execute("SELECT * FROM accounts WHERE id = ?", (vendor_account_id,))
-        vendor_account = cursor.fetchone()
-        
-        cursor.execute("SELECT * FROM email_templates WHERE name = ?", (template_name,))
-        template = cursor.fetchone()
-        
-        conn.close()
-        
-        if not all([opportunity, vendor_account, template]):
-            return {'error': 'Missing required data for preview'}
-        
-        # Generate preview variables (simplified)
-        variables = {
-            'request_number': opportunity['request_number'] if opportunity['request_number'] else f"REQ-{opportunity['id']}",
-            'product_name': opportunity['product_name'] if opportunity['product_name'] else 'Product Name',
-            'manufacturer': opportunity['manufacturer'] if opportunity['manufacturer'] else 'TBD',
-            'quantity': opportunity['quantity'] if opportunity['quantity'] else 1,
-            'vendor_contact_name': 'Vendor Contact',
-            'buyer_name': 'THE BUYER'
-        }
-        
-        # Create preview
-        subject = self._replace_template_variables(template['subject_template'], variables)
-        body = self._replace_template_variables(template['body_template'], variables)
-        
-        return {
-            'subject': subject,
-            'body': body,
-            'vendor_name': vendor_account['name'],
-            'template_name': template_name
-        }
+        with self._lock:
+            # This generates the email content but doesn't save it
+            # Useful for previewing before sending
+            
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            # Get opportunity details (same as generate_rfq_email but without saving)
+            cursor.execute("""
+                SELECT o.*, p.name as product_name, p.manufacturer, p.part_number, 
+                       p.nsn, p.description as product_description
+                FROM opportunities o
+                LEFT JOIN products p ON o.product_id = p.id
+                WHERE o.id = ?
+            """, (opportunity_id,))
+            opportunity = cursor.fetchone()
+            
+            cursor.execute("SELECT * FROM accounts WHERE id = ?", (vendor_account_id,))
+            vendor_account = cursor.fetchone()
+            
+            cursor.execute("SELECT * FROM email_templates WHERE name = ?", (template_name,))
+            template = cursor.fetchone()
+            
+            if not all([opportunity, vendor_account, template]):
+                return {'error': 'Missing required data for preview'}
+            
+            # Generate preview variables (simplified)
+            variables = {
+                'request_number': opportunity['request_number'] if opportunity['request_number'] else f"REQ-{opportunity['id']}",
+                'product_name': opportunity['product_name'] if opportunity['product_name'] else 'Product Name',
+                'manufacturer': opportunity['manufacturer'] if opportunity['manufacturer'] else 'TBD',
+                'quantity': opportunity['quantity'] if opportunity['quantity'] else 1,
+                'vendor_contact_name': 'Vendor Contact',
+                'buyer_name': 'THE BUYER'
+            }
+            
+            # Create preview
+            subject = self._replace_template_variables(template['subject_template'], variables)
+            body = self._replace_template_variables(template['body_template'], variables)
+            
+            return {
+                'subject': subject,
+                'body': body,
+                'vendor_name': vendor_account['name'],
+                'template_name': template_name
+            }
     
     def get_vendor_email_content(self, email_id: str) -> Dict:
         """Get the content of a specific vendor email for preview"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT ve.*, a.name as vendor_name, c.first_name, c.last_name, c.email as vendor_email
-            FROM vendor_rfq_emails ve
-            LEFT JOIN accounts a ON ve.vendor_account_id = a.id
-            LEFT JOIN contacts c ON ve.vendor_contact_id = c.id
-            WHERE ve.rfq_email_id = ?
-        """, (email_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return dict(row)
-        else:
-            return None
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT ve.*, a.name as vendor_name, c.first_name, c.last_name, c.email as vendor_email
+                FROM vendor_rfq_emails ve
+                LEFT JOIN accounts a ON ve.vendor_account_id = a.id
+                LEFT JOIN contacts c ON ve.vendor_contact_id = c.id
+                WHERE ve.rfq_email_id = ?
+            """, (email_id,))
+            
+            row = cursor.fetchone()
+            
+            if row:
+                return dict(row)
+            else:
+                return None
 
 # Global instance
 email_automation = EmailAutomation()
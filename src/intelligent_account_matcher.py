@@ -20,9 +20,16 @@ except ImportError:
     class DirectCRMData:
         def __init__(self):
             self.db_path = Path(__file__).parent / "data" / "crm.db"
+            self._conn = None  # opened lazily and reused across calls
+        
+        def _connect(self):
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._conn.row_factory = sqlite3.Row
+            return self._conn
         
         def get_accounts(self, filters=None):
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             if filters and 'name' in filters:
@@ -30,27 +37,18 @@ except ImportError:
             else:
                 cursor.execute("SELECT * FROM accounts")
             
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            conn.close()
-            
-            return [dict(zip(columns, row)) for row in rows]
+            return [dict(row) for row in cursor]
         
         def get_account_by_id(self, account_id):
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
             
             row = cursor.fetchone()
-            if row:
-                columns = [desc[0] for desc in cursor.description]
-                conn.close()
-                return dict(zip(columns, row))
-            conn.close()
-            return None
+            return dict(row) if row else None
         
         def create_account(self, **kwargs):
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Build insert query dynamically
@@ -63,7 +61,6 @@ except ImportError:
             
             account_id = cursor.lastrowid
             conn.commit()
-            conn.close()
             return account_id
     
     crm_data = DirectCRMData()
@@ -7,13 +7,48 @@ Parses manufacturer strings and creates QPL entries
 import re
 import sqlite3
 import os
+import threading
 from typing import List, Dict, Tuple
 
+from core.db_connection import open_connection
+
 class MFRParser:
     """Parse manufacturer strings and manage QPL data"""
     
+    # Manufacturer entries: [MANUFACTURER NAME] [CAGE CODE] P/N [PART NUMBER]
+    # CAGE codes can be 5 digits or alphanumeric (like 5F573)
+    MFR_ENTRY_RE = re.compile(r'([A-Z][A-Z\s\-&.,()]+?)\s+([A-Z0-9]{5})\s+P/N\s+([\w\-\/]+)')
+    
     def __init__(self, db_path: str = 'data/crm.db'):
         self.db_path = db_path
+        self._conn = None  # Opened on first use and kept for the parser's lifetime
+        self._in_batch = False  # True while process_opportunity_mfr owns the transaction
+        # The connection may be used from several threads; each call holds this through
+        # its commit or rollback, and a batch holds it for the whole transaction
+        self._lock = threading.RLock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return the parser's connection, opening it on first use"""
+        if self._conn is None:
+            self._conn = open_connection(self.db_path, check_same_thread=False)
+        return self._conn
+    
+    def close(self):
+        """Close the parser's connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _commit(self, conn: sqlite3.Connection):
+        """Commit a standalone call; a batch commits once at the end"""
+        if not self._in_batch:
+            conn.commit()
+    
+    def _rollback(self, conn: sqlite3.Connection):
+        """Roll back a standalone call; a failed statement inside a batch is already undone"""
+        if not self._in_batch:
+            conn.rollback()
         
     def parse_mfr_string(self, mfr_string: str) -> List[Dict[str, str]]:
         """
@@ -26,161 +61,153 @@ class MFRParser:
         if not mfr_string:
             return []
             
-        # Pattern to match manufacturer entries
-        # Looks for: [MANUFACTURER NAME] [CAGE CODE] P/N [PART NUMBER]
-        # CAGE codes can be 5 digits or alphanumeric (like 5F573)
-        pattern = r'([A-Z][A-Z\s\-&.,()]+?)\s+([A-Z0-9]{5})\s+P/N\s+([\w\-\/]+)'
-        
-        matches = re.findall(pattern, mfr_string)
-        
-        manufacturers = []
-        for match in matches:
-            manufacturer_name = match[0].strip()
-            cage_code = match[1].strip()
-            part_number = match[2].strip()
-            
-            manufacturers.append({
-                'manufacturer_name': manufacturer_name,
-                'cage_code': cage_code,
-                'part_number': part_number
-            })
-        
-        return manufacturers
+        return [
+            {
+                'manufacturer_name': manufacturer_name.strip(),
+                'cage_code': cage_code.strip(),
+                'part_number': part_number.strip()
+            }
+            for manufacturer_name, cage_code, part_number in self.MFR_ENTRY_RE.findall(mfr_string)
+        ]
     
     def create_or_update_qpl_account(self, manufacturer_name: str, cage_code: str) -> int:
         """Create or update QPL account for manufacturer"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Check if account exists by CAGE code (more reliable than name)
-            cursor.execute("""
-                SELECT id, name FROM accounts WHERE cage = ? AND type = 'Vendor'
-            """, (cage_code,))
-            
-            result = cursor.fetchone()
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
             
-            if result:
-                account_id, existing_name = result
-                # Update name if it's different (use the most recent/complete version)
-                if existing_name != manufacturer_name:
-                    cursor.execute("""
-                        UPDATE accounts 
-                        SET name = ? 
-                        WHERE id = ?
-                    """, (manufacturer_name, account_id))
-                    print(f"  Updated account {account_id}: {existing_name} -> {manufacturer_name}")
-                return account_id
-            else:
-                # Create new QPL account for QPL manufacturer
+            try:
+                # Check if account exists by CAGE code (more reliable than name)
                 cursor.execute("""
-                    INSERT INTO accounts (name, type, cage, created_date, is_active)
-                    VALUES (?, 'QPL', ?, CURRENT_TIMESTAMP, 1)
-                """, (manufacturer_name, cage_code))
+                    SELECT id, name FROM accounts WHERE cage = ? AND type = 'Vendor'
+                """, (cage_code,))
                 
-                account_id = cursor.lastrowid
-                print(f"  Created QPL account {account_id}: {manufacturer_name} (CAGE: {cage_code})")
-                conn.commit()
-                return account_id
+                result = cursor.fetchone()
                 
-        except Exception as e:
-            print(f"  ❌ Error creating/updating QPL account: {e}")
-            conn.rollback()
-            return None
-        finally:
-            conn.close()
+                if result:
+                    account_id, existing_name = result
+                    # Update name if it's different (use the most recent/complete version)
+                    if existing_name != manufacturer_name:
+                        cursor.execute("""
+                            UPDATE accounts 
+                            SET name = ? 
+                            WHERE id = ?
+                        """, (manufacturer_name, account_id))
+                        print(f"  Updated account {account_id}: {existing_name} -> {manufacturer_name}")
+                        self._commit(conn)
+                    return account_id
+                else:
+                    # Create new QPL account for QPL manufacturer
+                    cursor.execute("""
+                        INSERT INTO accounts (name, type, cage, created_date, is_active)
+                        VALUES (?, 'QPL', ?, CURRENT_TIMESTAMP, 1)
+                    """, (manufacturer_name, cage_code))
+                    
+                    account_id = cursor.lastrowid
+                    print(f"  Created QPL account {account_id}: {manufacturer_name} (CAGE: {cage_code})")
+                    self._commit(conn)
+                    return account_id
+                    
+            except Exception as e:
+                print(f"  ❌ Error creating/updating QPL account: {e}")
+                self._rollback(conn)
+                return None
     
     def create_or_update_product(self, nsn: str, product_name: str = None, description: str = None) -> int:
         """Create or update product by NSN"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Check if product exists by NSN
-            cursor.execute("SELECT id, name FROM products WHERE nsn = ?", (nsn,))
-            result = cursor.fetchone()
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
             
-            if result:
-                product_id, existing_name = result
-                # Update name and description if provided and different
-                updates = []
-                params = []
-                
-                if product_name and existing_name != product_name:
-                    updates.append("name = ?")
-                    params.append(product_name)
+            try:
+                # Check if product exists by NSN
+                cursor.execute("SELECT id, name FROM products WHERE nsn = ?", (nsn,))
+                result = cursor.fetchone()
                 
-                if description:
-                    updates.append("description = ?")
-                    params.append(description)
-                
-                if updates:
-                    updates.append("modified_date = CURRENT_TIMESTAMP")
-                    params.append(product_id)
+                if result:
+                    product_id, existing_name = result
+                    # Update name and description if provided and different
+                    updates = []
+                    params = []
                     
-                    cursor.execute(f"""
-                        UPDATE products 
-                        SET {', '.join(updates)}
-                        WHERE id = ?
-                    """, params)
-                    print(f"  Updated product {product_id}: {nsn}")
-                
-                return product_id
-            else:
-                # Create new product
-                cursor.execute("""
-                    INSERT INTO products (nsn, name, description, is_active, created_date, modified_date)
-                    VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                """, (nsn, product_name or f"Product {nsn}", description))
-                
-                product_id = cursor.lastrowid
-                print(f"  Created product {product_id}: {nsn}")
-                conn.commit()
-                return product_id
-                
-        except Exception as e:
-            print(f"  ❌ Error creating/updating product: {e}")
-            conn.rollback()
-            return None
-        finally:
-            conn.close()
+                    if product_name and existing_name != product_name:
+                        updates.append("name = ?")
+                        params.append(product_name)
+                    
+                    if description:
+                        updates.append("description = ?")
+                        params.append(description)
+                    
+                    if updates:
+                        updates.append("modified_date = CURRENT_TIMESTAMP")
+                        params.append(product_id)
+                        
+                        cursor.execute(f"""
+                            UPDATE products 
+                            SET {', '.join(updates)}
+                            WHERE id = ?
+                        """, params)
+                        print(f"  Updated product {product_id}: {nsn}")
+                        self._commit(conn)
+                    
+                    return product_id
+                else:
+                    # Create new product
+                    cursor.execute("""
+                        INSERT INTO products (nsn, name, description, is_active, created_date, modified_date)
+                        VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    """, (nsn, product_name or f"Product {nsn}", description))
+                    
+                    product_id = cursor.lastrowid
+                    print(f"  Created product {product_id}: {nsn}")
+                    self._commit(conn)
+                    return product_id
+                    
+            except Exception as e:
+                print(f"  ❌ Error creating/updating product: {e}")
+                self._rollback(conn)
+                return None
     
     def create_qpl_entry(self, product_id: int, account_id: int, manufacturer_name: str, cage_code: str, part_number: str) -> int:
         """Create QPL entry linking product to manufacturer"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Check if QPL entry already exists
-            cursor.execute("""
-                SELECT id FROM qpls 
-                WHERE product_id = ? AND account_id = ? AND part_number = ?
-            """, (product_id, account_id, part_number))
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
             
-            result = cursor.fetchone()
-            
-            if result:
-                print(f"  QPL entry already exists: {manufacturer_name} P/N {part_number}")
-                return result[0]
-            else:
-                # Create new QPL entry
+            try:
+                # Insert only if the entry is missing; RETURNING hands back the new
+                # id so the common create path needs no separate existence check
                 cursor.execute("""
                     INSERT INTO qpls 
                     (product_id, account_id, manufacturer_name, cage_code, part_number, is_active, created_date, modified_date)
-                    VALUES (?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                """, (product_id, account_id, manufacturer_name, cage_code, part_number))
+                    SELECT ?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM qpls 
+                        WHERE product_id = ? AND account_id = ? AND part_number = ?
+                    )
+                    RETURNING id
+                """, (product_id, account_id, manufacturer_name, cage_code, part_number,
+                      product_id, account_id, part_number))
                 
-                qpl_id = cursor.lastrowid
-                print(f"  ✅ Created QPL entry {qpl_id}: {manufacturer_name} P/N {part_number}")
-                conn.commit()
-                return qpl_id
+                result = cursor.fetchone()
                 
-        except Exception as e:
-            print(f"  ❌ Error creating QPL entry: {e}")
-            conn.rollback()
-            return None
-        finally:
-            conn.close()
+                if result:
+                    qpl_id = result[0]
+                    print(f"  ✅ Created QPL entry {qpl_id}: {manufacturer_name} P/N {part_number}")
+                    self._commit(conn)
+                    return qpl_id
+                else:
+                    cursor.execute("""
+                        SELECT id FROM qpls 
+                        WHERE product_id = ? AND account_id = ? AND part_number = ?
+                    """, (product_id, account_id, part_number))
+                    print(f"  QPL entry already exists: {manufacturer_name} P/N {part_number}")
+                    return cursor.fetchone()[0]
+                    
+            except Exception as e:
+                print(f"  ❌ Error creating QPL entry: {e}")
+                self._rollback(conn)
+                return None
     
     def process_opportunity_mfr(self, opportunity_id: int, nsn: str, mfr_string: str, product_name: str = None, description: str = None) -> Dict:
         """Process MFR string for an opportunity and create QPL entries"""
@@ -197,6 +224,23 @@ class MFRParser:
         
         print(f"  Found {len(manufacturers)} manufacturer(s)")
         
+        # Reuse one connection and one transaction for the product and every
+        # manufacturer entry instead of committing after each insert
+        with self._lock:
+            conn = self._connect()
+            self._in_batch = True
+            try:
+                result = self._process_manufacturers(nsn, manufacturers, product_name, description)
+                conn.commit()
+                return result
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._in_batch = False
+    
+    def _process_manufacturers(self, nsn: str, manufacturers: List[Dict[str, str]], product_name: str = None, description: str = None) -> Dict:
+        """Create the product and QPL entries for parsed manufacturers"""
         # Create or update product
         product_id = self.create_or_update_product(nsn, product_name, description)
         if not product_id:
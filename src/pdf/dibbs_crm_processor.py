@@ -6,6 +6,8 @@
 
 import fitz
 import csv
+import functools
+import itertools
 import re
 import os
 import json
@@ -14,14 +16,66 @@ import uuid
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+# orjson is optional; it serializes the processing reports several times faster.
+# Reports are only read back by the app, so they are written compact unless indent is set.
+try:
+    import orjson
+
+    def dumps_report(data, indent=False) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:
+    def dumps_report(data, indent=False) -> bytes:
+        return json.dumps(data, indent=2 if indent else None).encode('utf-8')
+
+# Field extraction patterns, compiled once at import instead of per PDF
+REQUEST_NUMBER_TOKEN_RE = re.compile(r'^[A-Z]{4}[0-9][A-Z][0-9]{2}[A-Z][0-9]{4}$')
+REQUEST_NO_RE = re.compile(r'1\. REQUEST NO\.\s*(\S+)\s*')
+BUYER_BLOCK_RE = re.compile(r'''
+    ^(DLA.*?)\n                               # First line (DLA Subset)
+    (.*?)\n                                   # Second line (Division)
+    (.*?)\n                                   # Third line (often address)
+    (.*?)\n                                   # Fourth line (city, state, zip)
+    (USA)\s*\n                                # Fifth line (always USA)
+    Name:\s*(.*?)\s+                          # Name
+    Buyer\s*Code:(\w+)\s+                     # Buyer Code
+    Tel:\s*(.*?)\s+                           # Telephone
+    (?:Fax:\s*([\d-]+)\s+)?                   # Fax (optional)
+    Email:\s*([^\s]+@[^\s]+)                  # Email
+''', re.MULTILINE | re.VERBOSE | re.IGNORECASE)
+BUYER_INFO_RE = re.compile(r'DLA.*?(?=\s*6\. DELIVER)', re.DOTALL)
+NSN_FSC_RE = re.compile(r'NSN/FSC:(\d+)/(\d+)')
+NSN_MATERIAL_RE = re.compile(r'NSN/MATERIAL:(\d+)')
+DELIVERY_DAYS_RE = re.compile(r'6. DELIVER BY\s*\S*\s*(\d+)')
+NON_NUMERIC_RE = re.compile(r'[^\d.]')
+BID_DATE_RE = re.compile(r'(\d{4})\s+(\w{3})\s+(\d{1,2})')
+FOB_RE = re.compile(r'FOB:\s*(\w+)')
+INSPECTION_POINT_RE = re.compile(r'INSPECTION\s*POINT:\s*(\w+)')
+PRODUCT_DESCRIPTION_RE = re.compile(r'ITEM\s*DESCRIPTION \s*(.*)')
+MFR_SPEC_LINE_RE = re.compile(
+    r'^[^\S\n]*((?:IAW BASIC SPEC NR|IAW REFERENCE SPEC NR|PART PIECE NUMBER:|REVISION NR(?=.*DTD)).*?)[^\S\n]*$',
+    re.MULTILINE
+)
+MFR_PART_NUMBER_RE = re.compile(r'^(.+?\s+\w{5}\s+P/N\s+.+)$', re.MULTILINE)
+ISO_RE = re.compile(r'(ISO\s*.*\s*.*)')
+SAMPLING_RE = re.compile(r'SAMPLING\s*.*\s*(.*)')
+PACKAGING_RE = re.compile(r'PKGING DATA - (.+?)(?=\n\s*\n|\Z)', re.DOTALL)
+MIL_STD_RE = re.compile(r'(MIL-STD-[^\s]*)')
+PURCHASE_NO_RE = re.compile(r'3\.\s*REQUISITION/PURCHASE REQUEST NO\.\s*(\S+)\s*')
+
+@functools.lru_cache(maxsize=1)
+def _read_page_texts(path: str, mtime_ns: int) -> Tuple[str, ...]:
+    """Extract the text of every page; cached so the readers in process_pdf parse a PDF once"""
+    with fitz.open(path) as doc:
+        return tuple(page.get_text("text") for page in doc)
 
 # Add the src directory to the path for imports
 src_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(src_dir))
 
 from core import crm_data
-from core.config_manager import config_manager
+from core.config_manager import config_manager, read_json_file
 
 # Create module reference for backward compatibility
 crm_data = crm_data.crm_data
@@ -63,6 +117,7 @@ class DIBBsCRMProcessor:
         # Default settings for PDF processing filters
         self.settings_file = self.base_dir / "config/settings.json"
         self.settings = self.load_settings()
+        self._mfr_parser = None  # created on the first QPL run
 
     def load_settings(self) -> Dict[str, Any]:
         """Load settings from file or create default settings"""
@@ -112,24 +167,25 @@ class DIBBsCRMProcessor:
         # Reload settings to ensure they're properly persisted
         self.settings = self.load_settings()
 
+    def get_page_texts(self, pdf_file):
+        """Return the text of each PDF page, parsing the file only once per revision"""
+        return _read_page_texts(str(pdf_file), os.stat(pdf_file).st_mtime_ns)
+
     def extract_text_from_pdf(self, pdf_file):
         """Extract text from PDF file"""
-        text = ""
-        with fitz.open(pdf_file) as doc:
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-        return text
+        return "".join(self.get_page_texts(pdf_file))
 
     def find_table_page(self, pdf_file, keyword):
         """Find page containing specific keyword"""
-        doc = fitz.open(pdf_file)
-        for page_number in range(len(doc)):
-            page = doc.load_page(page_number)
-            text = page.get_text()
+        page_number, _ = self.find_table_page_text(pdf_file, keyword)
+        return page_number
+
+    def find_table_page_text(self, pdf_file, keyword):
+        """Find the first page containing keyword, returning (page_number, page_text)"""
+        for page_number, text in enumerate(self.get_page_texts(pdf_file)):
             if keyword in text:
-                return page_number
-        return None
+                return page_number, text
+        return None, None
 
     def starts_with_word_without_numbers(self, line):
         """Check if line starts with word without numbers"""
@@ -153,11 +209,16 @@ class DIBBsCRMProcessor:
             # Extract potential request numbers
             parts = line.split()
             for part in parts:
-                if re.match(r'^[A-Z]{4}[0-9][A-Z][0-9]{2}[A-Z][0-9]{4}$', part):
+                if REQUEST_NUMBER_TOKEN_RE.match(part):
                     request_numbers.append(part)
         
         return request_numbers
 
+    def list_pdf_files(self, directory):
+        """List PDF files in a directory, matching the extension case-insensitively"""
+        return [path for path in directory.iterdir()
+                if path.suffix.lower() == '.pdf' and path.is_file()]
+
     def create_summary_files(self, today_str):
         """Create necessary output directories and files"""
         csv_file_path = self.summary_dir / f"{today_str}_output.csv"
@@ -196,8 +257,7 @@ class DIBBsCRMProcessor:
 
     def find_request_numbers(self, text):
         """Find request numbers using DIBBs.py pattern"""
-        request_no_pattern = r'1\. REQUEST NO\.\s*(\S+)\s*'
-        match = re.search(request_no_pattern, text)
+        match = REQUEST_NO_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -207,22 +267,8 @@ class DIBBsCRMProcessor:
         """Find buyer information using DIBBs.py pattern"""
         buyer = {}
 
-        # Regex pattern to find the information block
-        pattern = r'''
-            ^(DLA.*?)\n                               # First line (DLA Subset)
-            (.*?)\n                                   # Second line (Division)
-            (.*?)\n                                   # Third line (often address)
-            (.*?)\n                                   # Fourth line (city, state, zip)
-            (USA)\s*\n                                # Fifth line (always USA)
-            Name:\s*(.*?)\s+                          # Name
-            Buyer\s*Code:(\w+)\s+                     # Buyer Code
-            Tel:\s*(.*?)\s+                           # Telephone
-            (?:Fax:\s*([\d-]+)\s+)?                   # Fax (optional)
-            Email:\s*([^\s]+@[^\s]+)                  # Email
-        '''
-
-        # Find all matches in the document
-        match = re.search(pattern, text, re.MULTILINE | re.VERBOSE | re.IGNORECASE)
+        # Find the information block
+        match = BUYER_BLOCK_RE.search(text)
 
         if match:
             buyer["office"] = match.group(1)
@@ -243,27 +289,21 @@ class DIBBsCRMProcessor:
             buyer["fax"] = "Check Manually"
             buyer["email"] = "Check Manually"
 
-        # Regular expression pattern
-        pattern = r'DLA.*?(?=\s*6\. DELIVER)'
-        # Extract information using regular expression
-        matches = re.findall(pattern, text, re.DOTALL)
-        # Print the matches
-        for match in matches:
-            buyer["info"] = match.strip()
+        # Extract information using regular expression; the last match wins
+        for match in BUYER_INFO_RE.finditer(text):
+            buyer["info"] = match.group().strip()
 
         return buyer
 
     def find_nsn_and_fsc(self, text):
         """Find NSN and FSC using DIBBs.py pattern"""
-        nsn_fsc_pattern = r'NSN/FSC:(\d+)/(\d+)'
-        matches = re.search(nsn_fsc_pattern, text)
+        matches = NSN_FSC_RE.search(text)
         if matches:
             fsc = matches.group(2)
             nsn = fsc + matches.group(1)
             return nsn, fsc
         else:
-            nsn_material_pattern = r'NSN/MATERIAL:(\d+)'
-            matches = re.search(nsn_material_pattern, text)
+            matches = NSN_MATERIAL_RE.search(text)
             if matches:
                 if not matches.group(1).startswith(("5331", "5330")):
                     nsn = "5331" + matches.group(1)
@@ -275,8 +315,7 @@ class DIBBsCRMProcessor:
 
     def find_delivery_days(self, text):
         """Find delivery days using DIBBs.py pattern"""
-        delivery_days_pattern = r'6. DELIVER BY\s*\S*\s*(\d+)'
-        match = re.search(delivery_days_pattern, text)
+        match = DELIVERY_DAYS_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -284,13 +323,10 @@ class DIBBsCRMProcessor:
 
     def extract_table_text(self, pdf_file, keyword, skip_count):
         """Extract table text from PDF starting after a keyword"""
-        table_page = self.find_table_page(pdf_file, keyword)
+        # Reuse the text of the matching page rather than reopening the PDF
+        table_page, text = self.find_table_page_text(pdf_file, keyword)
         if table_page is not None:
             try:
-                import fitz
-                doc = fitz.open(pdf_file)
-                page = doc.load_page(table_page)
-                text = page.get_text("text")
                 output_text = ""
                 lines = text.split("\n")
                 for i, line in enumerate(lines):
@@ -329,7 +365,7 @@ class DIBBsCRMProcessor:
 
                 # Extract UI and Quantity values from the second line
                 ui = lines[1].split()[ui_index]
-                quantity = round(float(re.sub(r'[^\d.]', '', lines[1].split()[quantity_index])))
+                quantity = round(float(NON_NUMERIC_RE.sub('', lines[1].split()[quantity_index])))
 
                 return ui, quantity
             except (ValueError, IndexError):
@@ -339,14 +375,10 @@ class DIBBsCRMProcessor:
 
     def find_bid_dates(self, text):
         """Find bid dates using DIBBs.py pattern"""
-        # Regular expression to match dates in "YYYY MONTH DD" format
-        date_pattern = r'(\d{4})\s+(\w{3})\s+(\d{1,2})'
-
-        # Find all occurrences of dates in the text
-        matches = re.findall(date_pattern, text)
+        # Only the first two "YYYY MONTH DD" dates are used, so stop scanning after them
+        matches = [match.groups() for match in itertools.islice(BID_DATE_RE.finditer(text), 2)]
 
         if matches:
-            num_matches = len(matches)
             open_date = str(matches[0][1] + " " + matches[0][2] + ", " + matches[0][0])
             close_date = str(matches[1][1] + " " + matches[1][2] + ", " + matches[1][0])
             return open_date, close_date
@@ -355,8 +387,7 @@ class DIBBsCRMProcessor:
 
     def find_FOB(self, text):
         """Find FOB using DIBBs.py pattern"""
-        FOB_pattern = r'FOB:\s*(\w+)'
-        match = re.search(FOB_pattern, text)
+        match = FOB_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -364,8 +395,7 @@ class DIBBsCRMProcessor:
 
     def find_inspection_point(self, text):
         """Find inspection point using DIBBs.py pattern"""
-        inspection_point_pattern = r'INSPECTION\s*POINT:\s*(\w+)'
-        match = re.search(inspection_point_pattern, text)
+        match = INSPECTION_POINT_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -373,8 +403,7 @@ class DIBBsCRMProcessor:
 
     def find_product_description(self, text):
         """Find product description using DIBBs.py pattern"""
-        product_description_pattern = r'ITEM\s*DESCRIPTION \s*(.*)'
-        match = re.search(product_description_pattern, text)
+        match = PRODUCT_DESCRIPTION_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -382,27 +411,14 @@ class DIBBsCRMProcessor:
 
     def find_mfr(self, text):
         """Find manufacturer using enhanced pattern matching for various formats"""
-        # Look for IAW BASIC SPEC format (priority pattern) - line-based approach
-        lines = text.split('\n')
-        mfr_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('IAW BASIC SPEC NR'):
-                mfr_lines.append(line)
-            elif line.startswith('IAW REFERENCE SPEC NR'):
-                mfr_lines.append(line)
-            elif line.startswith('REVISION NR') and 'DTD' in line:
-                mfr_lines.append(line)
-            elif line.startswith('PART PIECE NUMBER:'):
-                mfr_lines.append(line)
+        # Look for IAW BASIC SPEC format (priority pattern) in one pass over the text
+        mfr_lines = MFR_SPEC_LINE_RE.findall(text)
         
         if mfr_lines:
             return ' '.join(mfr_lines)
         
         # Fallback to original P/N pattern for other document types
-        mfr_pattern = r'^(.+?\s+\w{5}\s+P/N\s+.+)$'
-        matches = re.findall(mfr_pattern, text, re.MULTILINE)
+        matches = MFR_PART_NUMBER_RE.findall(text)
 
         if matches:
             return '\n'.join(match.strip() for match in matches)
@@ -411,8 +427,7 @@ class DIBBsCRMProcessor:
 
     def find_ISO(self, text):
         """Find ISO requirement using DIBBs.py pattern"""
-        ISO_pattern = r'(ISO\s*.*\s*.*)'
-        match = re.search(ISO_pattern, text)
+        match = ISO_RE.search(text)
         if match:
             return "YES"
         else:
@@ -420,8 +435,7 @@ class DIBBsCRMProcessor:
 
     def find_sampling(self, text):
         """Find sampling requirement using DIBBs.py pattern"""
-        inspection_point_pattern = r'SAMPLING\s*.*\s*(.*)'
-        match = re.search(inspection_point_pattern, text)
+        match = SAMPLING_RE.search(text)
         if match:
             return "YES"
         else:
@@ -429,10 +443,8 @@ class DIBBsCRMProcessor:
 
     def find_packaging(self, text):
         """Find packaging information using DIBBs.py pattern"""
-        # Define the regular expression pattern
-        pattern = r'PKGING DATA - (.+?)(?=\n\s*\n|\Z)'
         # Search for the pattern in the text
-        match = re.search(pattern, text, re.DOTALL)
+        match = PACKAGING_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -440,13 +452,10 @@ class DIBBsCRMProcessor:
 
     def find_package_type(self, text):
         """Find package type using DIBBs.py pattern"""
-        package_pattern = r'ASTM'
-        match = re.search(package_pattern, text)
-        if match:
+        if 'ASTM' in text:
             return "ASTM"
         else:
-            package_patern = r'(MIL-STD-[^\s]*)'
-            match = re.search(package_patern, text)
+            match = MIL_STD_RE.search(text)
             if match:
                 return match.group(1).replace(",", "")
             else:
@@ -454,8 +463,7 @@ class DIBBsCRMProcessor:
 
     def find_purchase_numbers(self, text):
         """Find purchase numbers using DIBBs.py pattern"""
-        purchase_no_pattern = r'3\.\s*REQUISITION/PURCHASE REQUEST NO\.\s*(\S+)\s*'
-        match = re.search(purchase_no_pattern, text)
+        match = PURCHASE_NO_RE.search(text)
         if match:
             return match.group(1)
         else:
@@ -541,6 +549,9 @@ class DIBBsCRMProcessor:
             buyer_info = self.find_buyer(text)
             payment_history = self.find_payment_history(str(pdf_file_path))
             
+            # find_buyer returns a dict; resolve the fallback once rather than per field
+            buyer = buyer_info if isinstance(buyer_info, dict) else {}
+            
             # Create data structure compatible with CRM
             data = {
                 'request_number': request_number or '',
@@ -554,21 +565,21 @@ class DIBBsCRMProcessor:
                 'iso': iso,
                 'sampling': sampling,
                 'inspection_point': inspection_point or '',
-                'buyer': buyer_info.get('name', '') if isinstance(buyer_info, dict) else '',
-                'email': buyer_info.get('email', '') if isinstance(buyer_info, dict) else '',
+                'buyer': buyer.get('name', ''),
+                'email': buyer.get('email', ''),
                 'product_description': product_description if product_description != "Manually Check" else '',
                 'close_date': close_date or '',
                 'open_date': open_date or '',
                 'purchase_number': purchase_number if purchase_number != "Manually Check" else '',
                 'fsc': fsc if fsc != "Manually Check" else '',
                 'packaging': packaging if packaging != "Manually Check PDF" else '',
-                'office': buyer_info.get('office', '') if isinstance(buyer_info, dict) else '',
-                'division': buyer_info.get('division', '') if isinstance(buyer_info, dict) else '',
-                'address': buyer_info.get('address', '') if isinstance(buyer_info, dict) else '',
-                'buyer_code': buyer_info.get('buyer_code', '') if isinstance(buyer_info, dict) else '',
-                'telephone': buyer_info.get('tel', '') if isinstance(buyer_info, dict) else '',
-                'fax': buyer_info.get('fax', '') if isinstance(buyer_info, dict) else '',
-                'buyer_info': buyer_info.get('info', '') if isinstance(buyer_info, dict) else '',
+                'office': buyer.get('office', ''),
+                'division': buyer.get('division', ''),
+                'address': buyer.get('address', ''),
+                'buyer_code': buyer.get('buyer_code', ''),
+                'telephone': buyer.get('tel', ''),
+                'fax': buyer.get('fax', ''),
+                'buyer_info': buyer.get('info', ''),
                 'payment_history': payment_history if payment_history != "Manually Check" else '',
                 'skipped': False
             }
@@ -605,354 +616,379 @@ class DIBBsCRMProcessor:
     def create_crm_opportunity(self, pdf_data, pdf_file_path=None):
         """Create opportunity in CRM database from PDF data"""
         try:
-            # First, try to find or create the product
-            product_id = None
-            if pdf_data['nsn']:
-                # Check if product exists
-                existing_products = crm_data.get_products({'nsn': pdf_data['nsn']})
-                if existing_products:
-                    product_id = existing_products[0]['id']
+            # Product, account, contact and opportunity writes commit together, and
+            # what they record reaches self.results only once that commit has happened
+            tracked = {'created': 0, 'updated': 0, 'created_opportunities': []}
+            with crm_data.transaction():
+                opportunity_id = self.create_crm_records(pdf_data, pdf_file_path, tracked)
+            for key, value in tracked.items():
+                if isinstance(value, list):
+                    self.results.setdefault(key, []).extend(value)
                 else:
-                    # Create new product with all available PDF data
-                    product_name = pdf_data.get('product_description', '').strip()
-                    if not product_name or product_name == "Manually Check":
-                        product_name = f"Product for NSN {pdf_data['nsn']}"
-                    
-                    product_id = crm_data.create_product(
-                        name=product_name,
-                        nsn=pdf_data['nsn'],
-                        fsc=pdf_data.get('fsc', '') if pdf_data.get('fsc') != "Manually Check" else '',
-                        description=pdf_data.get('product_description', '').strip() if pdf_data.get('product_description') != "Manually Check" else '',
-                        manufacturer=pdf_data['mfr'] or 'Unknown',
-                        category='PDF Import',
-                        unit=pdf_data['unit'] or 'EA'
-                    )
-                    
-                    # Track product creation
-                    if not hasattr(self.results, 'created_products'):
-                        self.results['created_products'] = []
-                    self.results['created_products'].append({
-                        'id': product_id,
-                        'nsn': pdf_data['nsn'],
-                        'name': product_name,
-                        'fsc': pdf_data.get('fsc', '') if pdf_data.get('fsc') != "Manually Check" else '',
-                        'description': pdf_data.get('product_description', '').strip() if pdf_data.get('product_description') != "Manually Check" else ''
-                    })
+                    self.results[key] += value
             
-            # Try to find or create account from office/division information using intelligent matching
-            account_id = None
-            if pdf_data.get('office') or pdf_data.get('division'):
-                # Use intelligent account matcher to respect parent-child relationships
-                from intelligent_account_matcher import intelligent_account_matcher
-                
-                office = pdf_data.get('office', '')
-                division = pdf_data.get('division', '')
-                address = pdf_data.get('address', '')
-                
-                print(f"DEBUG: Using intelligent account matcher for Office='{office}', Division='{division}'")
-                account_id = intelligent_account_matcher.smart_account_match(office, division, address)
+            if not opportunity_id:
+                return None
+
+            # Process QPL data if MFR information is available; MFRParser uses its
+            # own connection, so this runs after the records above are committed
+            if pdf_data.get('mfr') and pdf_data.get('nsn'):
+                self.create_qpl_entries(opportunity_id, pdf_data)
+
+            return opportunity_id
+            
+        except Exception as e:
+            error_msg = f"Error creating CRM opportunity for {pdf_data['request_number']}: {str(e)}"
+            print(error_msg)
+            self.results['errors'].append(error_msg)
+        
+        return None
+
+    def create_crm_records(self, pdf_data, pdf_file_path=None, results=None):
+        """Find or create the product, account, contact and opportunity for PDF data"""
+        if results is None:
+            results = self.results
+        
+        # First, try to find or create the product
+        product_id = None
+        if pdf_data['nsn']:
+            # Check if product exists
+            existing_products = crm_data.get_products({'nsn': pdf_data['nsn']})
+            if existing_products:
+                product_id = existing_products[0]['id']
+            else:
+                # Create new product with all available PDF data
+                product_name = pdf_data.get('product_description', '').strip()
+                if not product_name or product_name == "Manually Check":
+                    product_name = f"Product for NSN {pdf_data['nsn']}"
                 
-                if account_id:
-                    print(f"DEBUG: Intelligent matcher returned account ID: {account_id}")
-                    # Get the account details for logging
-                    account = crm_data.get_account_by_id(account_id)
-                    if account:
-                        print(f"DEBUG: Using account: {account['name']} (Parent: {account.get('parent_co', 'None')})")
-                else:
-                    print(f"DEBUG: Intelligent matcher failed to find/create account")
+                product_id = crm_data.create_product(
+                    name=product_name,
+                    nsn=pdf_data['nsn'],
+                    fsc=pdf_data.get('fsc', '') if pdf_data.get('fsc') != "Manually Check" else '',
+                    description=pdf_data.get('product_description', '').strip() if pdf_data.get('product_description') != "Manually Check" else '',
+                    manufacturer=pdf_data['mfr'] or 'Unknown',
+                    category='PDF Import',
+                    unit=pdf_data['unit'] or 'EA'
+                )
                 
-                # Fallback to old logic only if intelligent matcher fails completely
-                if not account_id:
-                    print("DEBUG: Falling back to legacy account creation logic")
-                    account_name = f"{office} {division}".strip() if office and division else office or division or 'DLA'
-                    existing_accounts = crm_data.get_accounts({'name': account_name})
-                    
-                    if existing_accounts:
-                        account_id = existing_accounts[0]['id']
-                        print(f"DEBUG: Found existing account {account_id} for {account_name}")
-                        
-                        # Check if we can update the account with new information
-                        existing_account = existing_accounts[0]
-                        update_data = {}
-                        
-                        # Update billing address if it's missing or different
-                        new_address = pdf_data.get('address', '').strip()
-                        current_address = (existing_account.get('billing_address') or '').strip()
-                        if new_address and (not current_address or current_address != new_address):
-                            update_data['billing_address'] = new_address
-                            print(f"DEBUG: Will update account billing address")
-                        
-                        # Update summary if it's missing
-                        if not existing_account.get('summary'):
-                            update_data['summary'] = f"Defense Logistics Agency - {account_name}"
-                            print(f"DEBUG: Will update account summary")
-                        
-                        # Apply updates if any
-                        if update_data:
-                            try:
-                                crm_data.update_account(account_id, **update_data)
-                                print(f"DEBUG: Updated account {account_id} with: {list(update_data.keys())}")
-                                
-                                # Track account updates
-                                if not hasattr(self.results, 'updated_accounts'):
-                                    self.results['updated_accounts'] = []
-                                self.results['updated_accounts'].append({
-                                    'id': account_id,
-                                    'name': account_name,
-                                    'updates': list(update_data.keys())
-                                })
-                            except Exception as update_error:
-                                print(f"DEBUG: Failed to update account: {update_error}")
-                    else:
-                        # Create new account as last resort
-                        try:
-                            account_data = {
-                                'name': account_name,
-                                'type': 'Customer',  # Use valid type from CHECK constraint
-                                'summary': f"Defense Logistics Agency - {account_name}",
-                                'billing_address': pdf_data.get('address', ''),
-                                'is_active': True
-                            }
-                            
-                            account_id = crm_data.create_account(**account_data)
-                            print(f"DEBUG: Created new account {account_id} for {account_name}")
-                            
-                            # Track account creation
-                            if not hasattr(self.results, 'created_accounts'):
-                                self.results['created_accounts'] = []
-                            self.results['created_accounts'].append({
-                                'id': account_id,
-                                'name': account_name
-                            })
-                            
-                        except Exception as account_error:
-                            print(f"DEBUG: Failed to create account: {account_error}")
+                # Track product creation
+                if not hasattr(results, 'created_products'):
+                    results['created_products'] = []
+                results['created_products'].append({
+                    'id': product_id,
+                    'nsn': pdf_data['nsn'],
+                    'name': product_name,
+                    'fsc': pdf_data.get('fsc', '') if pdf_data.get('fsc') != "Manually Check" else '',
+                    'description': pdf_data.get('product_description', '').strip() if pdf_data.get('product_description') != "Manually Check" else ''
+                })
+        
+        # Try to find or create account from office/division information using intelligent matching
+        account_id = None
+        if pdf_data.get('office') or pdf_data.get('division'):
+            # Use intelligent account matcher to respect parent-child relationships
+            from intelligent_account_matcher import intelligent_account_matcher
+            
+            office = pdf_data.get('office', '')
+            division = pdf_data.get('division', '')
+            address = pdf_data.get('address', '')
+            
+            print(f"DEBUG: Using intelligent account matcher for Office='{office}', Division='{division}'")
+            account_id = intelligent_account_matcher.smart_account_match(office, division, address)
             
-            # Try to find or create contact from buyer information
-            contact_id = None
-            if pdf_data.get('email') and pdf_data.get('buyer'):
-                # Check if contact with this email already exists
-                existing_contacts = crm_data.get_contacts({'email': pdf_data['email']})
-                if existing_contacts:
-                    contact_id = existing_contacts[0]['id']
-                    print(f"DEBUG: Found existing contact {contact_id} for email {pdf_data['email']}")
+            if account_id:
+                print(f"DEBUG: Intelligent matcher returned account ID: {account_id}")
+                # Get the account details for logging
+                account = crm_data.get_account_by_id(account_id)
+                if account:
+                    print(f"DEBUG: Using account: {account['name']} (Parent: {account.get('parent_co', 'None')})")
+            else:
+                print(f"DEBUG: Intelligent matcher failed to find/create account")
+            
+            # Fallback to old logic only if intelligent matcher fails completely
+            if not account_id:
+                print("DEBUG: Falling back to legacy account creation logic")
+                account_name = f"{office} {division}".strip() if office and division else office or division or 'DLA'
+                existing_accounts = crm_data.get_accounts({'name': account_name})
+                
+                if existing_accounts:
+                    account_id = existing_accounts[0]['id']
+                    print(f"DEBUG: Found existing account {account_id} for {account_name}")
                     
-                    # Check if we can update the contact with new/better information
-                    existing_contact = existing_contacts[0]
+                    # Check if we can update the account with new information
+                    existing_account = existing_accounts[0]
                     update_data = {}
                     
-                    # Update account if missing
-                    if account_id and not existing_contact.get('account_id'):
-                        update_data['account_id'] = account_id
-                        print(f"DEBUG: Will link contact to account {account_id}")
-                    
-                    # Update phone if missing or different
-                    new_phone = pdf_data.get('telephone', '').strip()
-                    current_phone = (existing_contact.get('phone') or '').strip()
-                    if new_phone and (not current_phone or current_phone != new_phone):
-                        update_data['phone'] = new_phone
-                        print(f"DEBUG: Will update contact phone: {new_phone}")
-                    
-                    # Update fax if missing or different
-                    new_fax = pdf_data.get('fax', '').strip()
-                    current_fax = (existing_contact.get('fax') or '').strip()
-                    if new_fax and (not current_fax or current_fax != new_fax):
-                        update_data['fax'] = new_fax
-                        print(f"DEBUG: Will update contact fax: {new_fax}")
-                    
-                    # Update buyer_code if missing or different
-                    new_buyer_code = pdf_data.get('buyer_code', '').strip()
-                    current_buyer_code = (existing_contact.get('buyer_code') or '').strip()
-                    if new_buyer_code and (not current_buyer_code or current_buyer_code != new_buyer_code):
-                        update_data['buyer_code'] = new_buyer_code
-                        print(f"DEBUG: Will update contact buyer_code: {new_buyer_code}")
-                    
-                    # Update department if missing
-                    new_department = pdf_data.get('division', '').strip()
-                    current_department = (existing_contact.get('department') or '').strip()
-                    if new_department and not current_department:
-                        update_data['department'] = new_department
-                        print(f"DEBUG: Will update contact department: {new_department}")
-                    
-                    # Update address if missing or different
+                    # Update billing address if it's missing or different
                     new_address = pdf_data.get('address', '').strip()
-                    current_address = (existing_contact.get('address') or '').strip()
+                    current_address = (existing_account.get('billing_address') or '').strip()
                     if new_address and (not current_address or current_address != new_address):
-                        update_data['address'] = new_address
-                        print(f"DEBUG: Will update contact address")
+                        update_data['billing_address'] = new_address
+                        print(f"DEBUG: Will update account billing address")
+                    
+                    # Update summary if it's missing
+                    if not existing_account.get('summary'):
+                        update_data['summary'] = f"Defense Logistics Agency - {account_name}"
+                        print(f"DEBUG: Will update account summary")
                     
                     # Apply updates if any
                     if update_data:
                         try:
-                            crm_data.update_contact(contact_id, **update_data)
-                            print(f"DEBUG: Updated contact {contact_id} with: {list(update_data.keys())}")
+                            crm_data.update_account(account_id, **update_data)
+                            print(f"DEBUG: Updated account {account_id} with: {list(update_data.keys())}")
                             
-                            # Track contact updates
-                            if not hasattr(self.results, 'updated_contacts'):
-                                self.results['updated_contacts'] = []
-                            self.results['updated_contacts'].append({
-                                'id': contact_id,
-                                'name': pdf_data['buyer'],
-                                'email': pdf_data['email'],
+                            # Track account updates
+                            if not hasattr(results, 'updated_accounts'):
+                                results['updated_accounts'] = []
+                            results['updated_accounts'].append({
+                                'id': account_id,
+                                'name': account_name,
                                 'updates': list(update_data.keys())
                             })
                         except Exception as update_error:
-                            print(f"DEBUG: Failed to update contact: {update_error}")
+                            print(f"DEBUG: Failed to update account: {update_error}")
                 else:
-                    # Create new contact from buyer information
+                    # Create new account as last resort
                     try:
-                        # Split buyer name into first and last names
-                        buyer_name = pdf_data['buyer'].strip()
-                        name_parts = buyer_name.split(' ', 1)
-                        first_name = name_parts[0] if name_parts else buyer_name
-                        last_name = name_parts[1] if len(name_parts) > 1 else ''
-                        
-                        contact_data = {
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'email': pdf_data['email'],
-                            'phone': pdf_data.get('telephone', ''),
-                            'fax': pdf_data.get('fax', ''),
-                            'buyer_code': pdf_data.get('buyer_code', ''),
-                            'account_id': account_id,
-                            'department': pdf_data.get('division', ''),
-                            'address': pdf_data.get('address', ''),
-                            'lead_source': 'PDF Import',
-                            'description': f"Auto-created from PDF processing for request {pdf_data['request_number']}",
+                        account_data = {
+                            'name': account_name,
+                            'type': 'Customer',  # Use valid type from CHECK constraint
+                            'summary': f"Defense Logistics Agency - {account_name}",
+                            'billing_address': pdf_data.get('address', ''),
                             'is_active': True
                         }
                         
-                        contact_id = crm_data.create_contact(**contact_data)
-                        print(f"DEBUG: Created new contact {contact_id} for {pdf_data['buyer']} ({pdf_data['email']})")
+                        account_id = crm_data.create_account(**account_data)
+                        print(f"DEBUG: Created new account {account_id} for {account_name}")
+                        
+                        # Track account creation
+                        if not hasattr(results, 'created_accounts'):
+                            results['created_accounts'] = []
+                        results['created_accounts'].append({
+                            'id': account_id,
+                            'name': account_name
+                        })
+                        
+                    except Exception as account_error:
+                        print(f"DEBUG: Failed to create account: {account_error}")
+        
+        # Try to find or create contact from buyer information
+        contact_id = None
+        if pdf_data.get('email') and pdf_data.get('buyer'):
+            # Check if contact with this email already exists
+            existing_contacts = crm_data.get_contacts({'email': pdf_data['email']})
+            if existing_contacts:
+                contact_id = existing_contacts[0]['id']
+                print(f"DEBUG: Found existing contact {contact_id} for email {pdf_data['email']}")
+                
+                # Check if we can update the contact with new/better information
+                existing_contact = existing_contacts[0]
+                update_data = {}
+                
+                # Update account if missing
+                if account_id and not existing_contact.get('account_id'):
+                    update_data['account_id'] = account_id
+                    print(f"DEBUG: Will link contact to account {account_id}")
+                
+                # Update phone if missing or different
+                new_phone = pdf_data.get('telephone', '').strip()
+                current_phone = (existing_contact.get('phone') or '').strip()
+                if new_phone and (not current_phone or current_phone != new_phone):
+                    update_data['phone'] = new_phone
+                    print(f"DEBUG: Will update contact phone: {new_phone}")
+                
+                # Update fax if missing or different
+                new_fax = pdf_data.get('fax', '').strip()
+                current_fax = (existing_contact.get('fax') or '').strip()
+                if new_fax and (not current_fax or current_fax != new_fax):
+                    update_data['fax'] = new_fax
+                    print(f"DEBUG: Will update contact fax: {new_fax}")
+                
+                # Update buyer_code if missing or different
+                new_buyer_code = pdf_data.get('buyer_code', '').strip()
+                current_buyer_code = (existing_contact.get('buyer_code') or '').strip()
+                if new_buyer_code and (not current_buyer_code or current_buyer_code != new_buyer_code):
+                    update_data['buyer_code'] = new_buyer_code
+                    print(f"DEBUG: Will update contact buyer_code: {new_buyer_code}")
+                
+                # Update department if missing
+                new_department = pdf_data.get('division', '').strip()
+                current_department = (existing_contact.get('department') or '').strip()
+                if new_department and not current_department:
+                    update_data['department'] = new_department
+                    print(f"DEBUG: Will update contact department: {new_department}")
+                
+                # Update address if missing or different
+                new_address = pdf_data.get('address', '').strip()
+                current_address = (existing_contact.get('address') or '').strip()
+                if new_address and (not current_address or current_address != new_address):
+                    update_data['address'] = new_address
+                    print(f"DEBUG: Will update contact address")
+                
+                # Apply updates if any
+                if update_data:
+                    try:
+                        crm_data.update_contact(contact_id, **update_data)
+                        print(f"DEBUG: Updated contact {contact_id} with: {list(update_data.keys())}")
                         
-                        # Update results to track contact creation
-                        if not hasattr(self.results, 'created_contacts'):
-                            self.results['created_contacts'] = []
-                        self.results['created_contacts'].append({
+                        # Track contact updates
+                        if not hasattr(results, 'updated_contacts'):
+                            results['updated_contacts'] = []
+                        results['updated_contacts'].append({
                             'id': contact_id,
                             'name': pdf_data['buyer'],
                             'email': pdf_data['email'],
-                            'buyer_code': pdf_data.get('buyer_code', '')
+                            'updates': list(update_data.keys())
                         })
-                        
-                    except Exception as contact_error:
-                        print(f"DEBUG: Failed to create contact: {contact_error}")
-                        # Continue with opportunity creation even if contact creation fails
-            
-            # Check if opportunity already exists
-            opportunity_name = f"{pdf_data['request_number']}"
-            existing_opportunity = crm_data.get_opportunity_by_name(opportunity_name)
-            
-            # Create opportunity data
-            opportunity_data = {
-                'name': opportunity_name,
-                'description': f"Auto-created from PDF processing for request {pdf_data['request_number']}. Product: {pdf_data.get('product_description', '').strip()}. Buyer: {pdf_data.get('buyer', 'Unknown')}. Email: {pdf_data.get('email', 'N/A')}",
-                'stage': 'Prospecting',
-                'state': 'Active',
-                'nsn': pdf_data['nsn'] if pdf_data['nsn'] else '',
-                'quantity': int(pdf_data['quantity']) if pdf_data['quantity'] else 1,
-                'unit': pdf_data['unit'] or 'EA',
-                'mfr': pdf_data['mfr'] or '',
-                'buyer': pdf_data.get('buyer', '') or '',
-                'delivery_days': int(pdf_data['delivery_days']) if pdf_data['delivery_days'] else None,
-                'fob': 'Origin' if pdf_data.get('fob', '').upper().strip() == 'ORIGIN' else 'Destination',
-                'packaging_type': pdf_data['packaging_type'] or '',
-                'iso': 'Yes' if pdf_data['iso'] == 'YES' else 'No',
-                'sampling': 'Yes' if pdf_data['sampling'] == 'YES' else 'No',
-                'close_date': self._parse_date(pdf_data.get('close_date')),
-                'payment_history': pdf_data.get('payment_history', '') or '',
-                'product_id': product_id,
-                'pdf_file_path': pdf_file_path or ''
-            }
-            
-            # Link the contact and account to the opportunity
-            if contact_id:
-                opportunity_data['contact_id'] = contact_id
-            if account_id:
-                opportunity_data['account_id'] = account_id
-            
-            # Debug FOB value specifically
-            print(f"DEBUG FOB: Raw='{pdf_data['fob']}', Processed='{opportunity_data['fob']}'")
-            
-            if existing_opportunity:
-                # Update existing opportunity
-                opportunity_id = existing_opportunity['id']
-                print(f"DEBUG: Updating existing opportunity {opportunity_id} with data: {opportunity_data}")
-                crm_data.update_opportunity(opportunity_id, **opportunity_data)
-                self.results['updated'] += 1
-                print(f"✓ Updated existing opportunity: {opportunity_name}")
+                    except Exception as update_error:
+                        print(f"DEBUG: Failed to update contact: {update_error}")
             else:
-                # Create new opportunity
-                print(f"DEBUG: Creating new opportunity with data: {opportunity_data}")
-                opportunity_id = crm_data.create_opportunity(**opportunity_data)
-                
-                if opportunity_id:
-                    self.results['created'] += 1
-                    self.results['created_opportunities'].append({
-                        'id': opportunity_id,
-                        'request_number': pdf_data['request_number'],
-                        'nsn': pdf_data['nsn']
+                # Create new contact from buyer information
+                try:
+                    # Split buyer name into first and last names
+                    buyer_name = pdf_data['buyer'].strip()
+                    name_parts = buyer_name.split(' ', 1)
+                    first_name = name_parts[0] if name_parts else buyer_name
+                    last_name = name_parts[1] if len(name_parts) > 1 else ''
+                    
+                    contact_data = {
+                        'first_name': first_name,
+                        'last_name': last_name,
+                        'email': pdf_data['email'],
+                        'phone': pdf_data.get('telephone', ''),
+                        'fax': pdf_data.get('fax', ''),
+                        'buyer_code': pdf_data.get('buyer_code', ''),
+                        'account_id': account_id,
+                        'department': pdf_data.get('division', ''),
+                        'address': pdf_data.get('address', ''),
+                        'lead_source': 'PDF Import',
+                        'description': f"Auto-created from PDF processing for request {pdf_data['request_number']}",
+                        'is_active': True
+                    }
+                    
+                    contact_id = crm_data.create_contact(**contact_data)
+                    print(f"DEBUG: Created new contact {contact_id} for {pdf_data['buyer']} ({pdf_data['email']})")
+                    
+                    # Update results to track contact creation
+                    if not hasattr(results, 'created_contacts'):
+                        results['created_contacts'] = []
+                    results['created_contacts'].append({
+                        'id': contact_id,
+                        'name': pdf_data['buyer'],
+                        'email': pdf_data['email'],
+                        'buyer_code': pdf_data.get('buyer_code', '')
                     })
-                    print(f"✓ Created new opportunity: {opportunity_name}")
+                    
+                except Exception as contact_error:
+                    print(f"DEBUG: Failed to create contact: {contact_error}")
+                    # Continue with opportunity creation even if contact creation fails
+        
+        # Check if opportunity already exists
+        opportunity_name = f"{pdf_data['request_number']}"
+        existing_opportunity = crm_data.get_opportunity_by_name(opportunity_name)
+        
+        # Create opportunity data
+        opportunity_data = {
+            'name': opportunity_name,
+            'description': f"Auto-created from PDF processing for request {pdf_data['request_number']}. Product: {pdf_data.get('product_description', '').strip()}. Buyer: {pdf_data.get('buyer', 'Unknown')}. Email: {pdf_data.get('email', 'N/A')}",
+            'stage': 'Prospecting',
+            'state': 'Active',
+            'nsn': pdf_data['nsn'] if pdf_data['nsn'] else '',
+            'quantity': int(pdf_data['quantity']) if pdf_data['quantity'] else 1,
+            'unit': pdf_data['unit'] or 'EA',
+            'mfr': pdf_data['mfr'] or '',
+            'buyer': pdf_data.get('buyer', '') or '',
+            'delivery_days': int(pdf_data['delivery_days']) if pdf_data['delivery_days'] else None,
+            'fob': 'Origin' if pdf_data.get('fob', '').upper().strip() == 'ORIGIN' else 'Destination',
+            'packaging_type': pdf_data['packaging_type'] or '',
+            'iso': 'Yes' if pdf_data['iso'] == 'YES' else 'No',
+            'sampling': 'Yes' if pdf_data['sampling'] == 'YES' else 'No',
+            'close_date': self._parse_date(pdf_data.get('close_date')),
+            'payment_history': pdf_data.get('payment_history', '') or '',
+            'product_id': product_id,
+            'pdf_file_path': pdf_file_path or ''
+        }
+        
+        # Link the contact and account to the opportunity
+        if contact_id:
+            opportunity_data['contact_id'] = contact_id
+        if account_id:
+            opportunity_data['account_id'] = account_id
+        
+        # Debug FOB value specifically
+        print(f"DEBUG FOB: Raw='{pdf_data['fob']}', Processed='{opportunity_data['fob']}'")
+        
+        if existing_opportunity:
+            # Update existing opportunity
+            opportunity_id = existing_opportunity['id']
+            print(f"DEBUG: Updating existing opportunity {opportunity_id} with data: {opportunity_data}")
+            crm_data.update_opportunity(opportunity_id, **opportunity_data)
+            results['updated'] += 1
+            print(f"✓ Updated existing opportunity: {opportunity_name}")
+        else:
+            # Create new opportunity
+            print(f"DEBUG: Creating new opportunity with data: {opportunity_data}")
+            opportunity_id = crm_data.create_opportunity(**opportunity_data)
             
             if opportunity_id:
+                results['created'] += 1
+                results['created_opportunities'].append({
+                    'id': opportunity_id,
+                    'request_number': pdf_data['request_number'],
+                    'nsn': pdf_data['nsn']
+                })
+                print(f"✓ Created new opportunity: {opportunity_name}")
+
+        return opportunity_id
+
+    def get_mfr_parser(self):
+        """Return the MFR parser, importing and creating it on first use only"""
+        if self._mfr_parser is None:
+            # Add the src directory to path for the import
+            src_dir = str(self.base_dir / "src")
+            if src_dir not in sys.path:
+                sys.path.insert(0, src_dir)
+            
+            from mfr_parser import MFRParser
+            self._mfr_parser = MFRParser()
+        return self._mfr_parser
+
+    def create_qpl_entries(self, opportunity_id, pdf_data):
+        """Create QPL entries for an opportunity from its MFR string"""
+        try:
+            print(f"🔄 Processing QPL for opportunity {opportunity_id}")
+            print(f"   NSN: {pdf_data['nsn']}")
+            print(f"   MFR: {pdf_data['mfr']}")
+            
+            parser = self.get_mfr_parser()
+            qpl_result = parser.process_opportunity_mfr(
+                opportunity_id=opportunity_id,
+                nsn=pdf_data['nsn'],
+                mfr_string=pdf_data['mfr'],
+                product_name=pdf_data.get('product_description', f"Product {pdf_data['nsn']}"),
+                description=pdf_data.get('product_description', '')
+            )
+            
+            if qpl_result['success']:
+                print(f"✓ Successfully created {qpl_result['manufacturers_count']} QPL entries for opportunity {opportunity_id}")
+                self.results['created_qpl_entries'] = self.results.get('created_qpl_entries', 0) + qpl_result['manufacturers_count']
                 
-                # Process QPL data if MFR information is available
-                if pdf_data.get('mfr') and pdf_data.get('nsn'):
-                    try:
-                        # Import MFR parser with proper path handling
-                        import sys
-                        import os
-                        
-                        # Add the src directory to path for the import
-                        src_dir = str(self.base_dir / "src")
-                        if src_dir not in sys.path:
-                            sys.path.insert(0, src_dir)
-                        
-                        from mfr_parser import MFRParser
-                        
-                        print(f"🔄 Processing QPL for opportunity {opportunity_id}")
-                        print(f"   NSN: {pdf_data['nsn']}")
-                        print(f"   MFR: {pdf_data['mfr']}")
-                        
-                        parser = MFRParser()
-                        qpl_result = parser.process_opportunity_mfr(
-                            opportunity_id=opportunity_id,
-                            nsn=pdf_data['nsn'],
-                            mfr_string=pdf_data['mfr'],
-                            product_name=pdf_data.get('product_description', f"Product {pdf_data['nsn']}"),
-                            description=pdf_data.get('product_description', '')
-                        )
-                        
-                        if qpl_result['success']:
-                            print(f"✓ Successfully created {qpl_result['manufacturers_count']} QPL entries for opportunity {opportunity_id}")
-                            self.results['created_qpl_entries'] = self.results.get('created_qpl_entries', 0) + qpl_result['manufacturers_count']
-                            
-                            # Track QPL creation in results
-                            if 'qpl_entries' not in self.results:
-                                self.results['qpl_entries'] = []
-                            self.results['qpl_entries'].extend(qpl_result['qpl_entries'])
-                        else:
-                            print(f"⚠️ QPL processing failed: {qpl_result.get('message', 'Unknown error')}")
-                            
-                    except ImportError as import_error:
-                        print(f"⚠️ Failed to import MFR parser: {import_error}")
-                        print(f"   Src dir: {src_dir}")
-                        print(f"   Current working directory: {os.getcwd()}")
-                    except Exception as qpl_error:
-                        print(f"⚠️ QPL processing error for opportunity {opportunity_id}: {qpl_error}")
-                        import traceback
-                        traceback.print_exc()
-                        # Don't fail the whole process if QPL processing fails
+                # Track QPL creation in results
+                if 'qpl_entries' not in self.results:
+                    self.results['qpl_entries'] = []
+                self.results['qpl_entries'].extend(qpl_result['qpl_entries'])
+            else:
+                print(f"⚠️ QPL processing failed: {qpl_result.get('message', 'Unknown error')}")
                 
-                return opportunity_id
-            
-        except Exception as e:
-            error_msg = f"Error creating CRM opportunity for {pdf_data['request_number']}: {str(e)}"
-            print(error_msg)
-            self.results['errors'].append(error_msg)
-        
-        return None
+        except ImportError as import_error:
+            print(f"⚠️ Failed to import MFR parser: {import_error}")
+            print(f"   Src dir: {self.base_dir / 'src'}")
+            print(f"   Current working directory: {os.getcwd()}")
+        except Exception as qpl_error:
+            print(f"⚠️ QPL processing error for opportunity {opportunity_id}: {qpl_error}")
+            import traceback
+            traceback.print_exc()
+            # Don't fail the whole process if QPL processing fails
 
     def process_all_pdfs(self):
         """Process all PDFs in the To Process folder"""
@@ -979,8 +1015,8 @@ class DIBBsCRMProcessor:
         
         csv_file_path = self.summary_dir / f"{today_str}_output.csv"
         
-        # Get list of PDF files (deduplicated)
-        pdf_files = list(set(list(self.pdf_dir.glob("*.pdf")) + list(self.pdf_dir.glob("*.PDF"))))
+        # Get list of PDF files in one directory pass (any extension case)
+        pdf_files = self.list_pdf_files(self.pdf_dir)
         
         if not pdf_files:
             print("No PDF files found to process")
@@ -1047,8 +1083,7 @@ class DIBBsCRMProcessor:
                             
                             # Save summary file
                             summary_file = pdf_destination / f"{pdf_data['request_number']}.txt"
-                            with open(summary_file, 'w') as f:
-                                json.dump(pdf_data, f, indent=4)
+                            summary_file.write_bytes(dumps_report(pdf_data, indent=True))
                             
                             self.move_files(str(pdf_file), str(pdf_destination))
                             
@@ -1110,7 +1145,7 @@ class DIBBsCRMProcessor:
                         })
                     
                     # Write to CSV
-                    writer.writerow(list(pdf_data.values()))
+                    writer.writerow(pdf_data.values())
                     self.results['processed'] += 1
                     
                 except Exception as e:
@@ -1307,7 +1342,6 @@ class DIBBsCRMProcessor:
         """Save detailed processing report to file for web interface"""
         try:
             from datetime import datetime
-            import json
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             report_file = self.summary_dir / f"pdf_processing_report_{timestamp}.json"
@@ -1357,8 +1391,7 @@ class DIBBsCRMProcessor:
                 'errors': self.results['errors']
             }
             
-            with open(report_file, 'w') as f:
-                json.dump(report_data, f, indent=2)
+            report_file.write_bytes(dumps_report(report_data))
             
             print(f"Processing report saved to: {report_file}")
             
@@ -1444,8 +1477,8 @@ class DIBBsCRMProcessor:
     def load_settings(self):
         """Load settings from settings.json"""
         try:
-            with open('config/settings.json', 'r') as f:
-                return json.load(f)
+            # Only re-parse the file when it has changed on disk
+            return read_json_file(self.settings_file)
         except:
             return {
                 'min_delivery_days': 50,